@@ -1,16 +1,60 @@
 # app.py - versiune corectată
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+import os
 import chess
 import random
+import time
 from copy import deepcopy
 from flask_cors import CORS
 from minimax_ai import MinimaxAI
+from engine_session import EngineSession, SessionBudget
+from game_events import GameEventBus
+from game_history import GameHistory
+from search_scheduler import SearchScheduler, SchedulerBusy
+import hostage_rules
+import batch_analysis
+import json
+import game_archive
+from game_store import GameStore
+from request_profiler import PROFILE_SCOPE, RequestProfile, requested_mode
 
 app = Flask(__name__)
 CORS(app)
-
-games = {}
+# Profilarea la cerere (X-Profile) e dezactivată implicit; se pornește din server cu
+# HOSTAGE_PROFILING=1, ca un client anonim să nu poată porni cProfile sau scrie fișiere
+app.config['PROFILING_ENABLED'] = os.environ.get('HOSTAGE_PROFILING', '0') in ('1', 'true', 'on')
+
+# După câte secunde fără cereri este compactat un joc
+GAME_IDLE_SECONDS = 600
+
+event_bus = GameEventBus()
+# Jocurile inactive sunt compactate și reconstruite la următorul acces; canalul push
+# al unui joc compactat sau șters e eliminat, iar clienții care reiau fluxul primesc un snapshot.
+# Jocurile cu fluxuri deschise nu sunt compactate, ca spectatorii să nu fie deconectați
+games = GameStore(lambda: create_new_game(), idle_seconds=GAME_IDLE_SECONDS, on_release=event_bus.remove,
+                  keep_alive=event_bus.has_listeners)
 ai = MinimaxAI(depth=3)
+search_scheduler = SearchScheduler()
+# Limita comună de memorie a sesiunilor motorului (evacuare LRU între jocuri)
+session_budget = SessionBudget()
+
+# Directorul fișierelor flamegraph pentru cererile profilate cu X-Profile: flame;
+# sunt păstrate doar cele mai recente MAX_PROFILE_FILES
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+MAX_PROFILE_FILES = 50
+
+# Adâncimea de căutare pentru fiecare nivel de dificultate
+DIFFICULTY_DEPTHS = {'easy': 2, 'medium': 3, 'hard': 4}
+
+# Limite pentru analiza în lot prin HTTP (căutări scurte, loturi finite)
+MAX_BATCH_DEPTH = 2
+MAX_BATCH_POSITIONS = 10000
+# Procesele pool-ului comun de analiză; jumătate din nuclee rămân pentru căutările interactive
+BATCH_PROCESSES = max(1, (os.cpu_count() or 1) // 2)
+
+# Limite pentru analiza multi-PV
+MAX_MULTIPV_LINES = 10
+MAX_MULTIPV_DEPTH = 4
 
 def create_new_game():
     return {
@@ -20,9 +64,177 @@ def create_new_game():
         'turn_phase': 'normal',  # 'normal', 'exchange', 'drop'
         'last_move': None,
         'move_count': 0,  # Adăugat pentru debugging
-        'game_status': 'active'  # Adăugat pentru tracking status
+        'game_status': 'active',  # Adăugat pentru tracking status
+        'version': 0,  # Crește la fiecare schimbare a stării
+        'field_versions': {'fen': 0, 'hostages': 0, 'reserves': 0},
+        'status_cache': None,  # Flag-urile de stare calculate pentru versiunea curentă
+        'actions_cache': None,  # Acțiunile legale calculate pentru versiunea curentă
+        'history': GameHistory(),  # Jurnal reversibil de mutări, plasări și schimburi
+        'engine_session': None  # Starea motorului între mutările AI-ului (vezi engine_session)
     }
 
+def get_engine_session(game_state):
+    """
+    Sesiunea motorului pentru joc, creată la prima căutare. Nu e inclusă în
+    instantaneele GameStore, deci un joc compactat o pierde și o reface de la zero.
+    """
+    session = game_state.get('engine_session')
+    if session is None:
+        session = game_state['engine_session'] = EngineSession(budget=session_budget)
+    return session
+
+def mark_changed(game_state, *fields):
+    """Incrementează versiunea jocului și marchează câmpurile modificate"""
+    game_state['version'] = game_state.get('version', 0) + 1
+    field_versions = game_state.setdefault('field_versions', {})
+    for field in fields:
+        field_versions[field] = game_state['version']
+
+def get_position_status(game_state):
+    """
+    Calculează flag-urile de stare ale poziției o singură dată per versiune
+    și le păstrează în cache pe joc.
+    """
+    cache = game_state.get('status_cache')
+    if cache and cache['version'] == game_state.get('version', 0):
+        return cache['status']
+
+    board = game_state['board']
+    check = board.is_check()
+    # O singură verificare a acțiunilor legale (mutări, plasări, schimburi) pentru mat și pat
+    has_legal_action = hostage_rules.has_legal_action(game_state)
+    checkmate = check and not has_legal_action
+    stalemate = not check and not has_legal_action
+    insufficient_material = hostage_rules.is_insufficient_material(game_state)
+    fifty_moves = board.is_fifty_moves()
+
+    status = {
+        'check': check,
+        'checkmate': checkmate,
+        'stalemate': stalemate,
+        'insufficient_material': insufficient_material,
+        'fifty_moves': fifty_moves,
+        'draw': stalemate or insufficient_material or fifty_moves
+    }
+    game_state['status_cache'] = {'version': game_state.get('version', 0), 'status': status}
+    return status
+
+def get_legal_actions(game_state):
+    """Acțiunile legale (mutări, plasări, schimburi), calculate o dată per versiune"""
+    cache = game_state.get('actions_cache')
+    if cache and cache['version'] == game_state.get('version', 0):
+        return cache['actions']
+
+    actions = hostage_rules.legal_actions(game_state)
+    game_state['actions_cache'] = {'version': game_state.get('version', 0), 'actions': actions}
+    return actions
+
+def update_game_over(game_state):
+    """Verifică dacă jocul s-a terminat și actualizează game_status"""
+    status = get_position_status(game_state)
+
+    game_result = None
+    if status['checkmate']:
+        game_result = 'checkmate'
+    elif status['stalemate']:
+        game_result = 'stalemate'
+    elif status['insufficient_material']:
+        game_result = 'insufficient_material'
+    elif status['fifty_moves']:
+        game_result = '50_moves'
+
+    if game_result:
+        game_state['game_status'] = 'finished'
+        # Partida terminată nu mai are nevoie de starea motorului
+        game_state['engine_session'] = None
+    return game_result is not None, game_result
+
+def build_state_response(game_state, since_version=None):
+    """
+    Construiește partea comună a răspunsurilor cu starea jocului.
+    Dacă clientul trimite since_version, sunt incluse doar câmpurile
+    (fen, hostages, reserves) modificate după acea versiune.
+    """
+    board = game_state['board']
+    status = get_position_status(game_state)
+    field_versions = game_state.get('field_versions', {})
+    values = {
+        'fen': lambda: board.fen(),
+        'hostages': lambda: game_state['hostages'],
+        'reserves': lambda: game_state['reserves']
+    }
+
+    response = {}
+    for field, value in values.items():
+        if since_version is None or field_versions.get(field, 0) > since_version:
+            response[field] = value()
+
+    response.update({
+        'turn': 'w' if board.turn else 'b',
+        'check': status['check'],
+        'checkmate': status['checkmate'],
+        'draw': status['draw'],
+        'version': game_state.get('version', 0)
+    })
+    if since_version is not None:
+        response['delta'] = True
+        response['since_version'] = since_version
+    return response
+
+def get_since_version():
+    """Citește versiunea opțională trimisă de client pentru răspunsuri delta"""
+    since_version = request.json.get('since_version')
+    if since_version is None:
+        return None
+    try:
+        return int(since_version)
+    except (TypeError, ValueError):
+        return None
+
+@app.before_request
+def start_profiling():
+    """Profilare opțională a cererii, cerută prin X-Profile sau ?profile= (dacă serverul o permite)"""
+    if not app.config['PROFILING_ENABLED']:
+        return
+    mode = requested_mode(request.headers, request.args)
+    if mode is None:
+        return
+    profile = RequestProfile(flamegraph=mode == 'flame')
+    if profile.start():
+        g.profile = profile
+
+@app.after_request
+def finish_profiling(response):
+    """Adaugă rezultatele profilării: Server-Timing, câmpul 'profile' și flamegraph-ul"""
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    profile.stop()
+
+    response.headers['Server-Timing'] = profile.server_timing()
+    if profile.flamegraph:
+        path = profile.write_folded(PROFILE_DIR, request.endpoint, MAX_PROFILE_FILES)
+        response.headers['X-Profile-Flamegraph'] = os.path.basename(path)
+    # Răspunsurile în flux nu sunt modificate; corpul lor e generat după handler
+    if response.is_json and not response.is_streamed:
+        data = response.get_json(silent=True)
+        if isinstance(data, dict):
+            data['profile'] = {
+                # 'process' pe Python 3.12+: timpii includ și cererile simultane
+                'scope': PROFILE_SCOPE,
+                'timings_ms': profile.breakdown(),
+                'top_functions': profile.top_functions()
+            }
+            response.set_data(json.dumps(data))
+    return response
+
+@app.teardown_request
+def stop_profiling(error=None):
+    # Dacă handler-ul a aruncat o excepție, after_request nu rulează
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+
 @app.route('/new_game', methods=['POST'])
 def new_game():
     game_id = str(random.randint(1000, 9999))
@@ -34,6 +246,7 @@ def make_move():
     try:
         game_id = request.json.get('game_id')
         move_uci = request.json.get('move')
+        since_version = get_since_version()
 
         if game_id not in games:
             return jsonify({'error': 'Game not found'}), 404
@@ -58,65 +271,26 @@ def make_move():
         if move not in board.legal_moves:
             return jsonify({'error': 'Invalid move - not in legal moves'}), 400
 
-        # Salvează piesa capturată ÎNAINTE de mutare
-        captured_piece = board.piece_at(move.to_square)
-        
-        # Execută mutarea
-        board.push(move)
-        game_state['move_count'] += 1
-        
-        # Actualizează ostaticii dacă a fost captură
-        if captured_piece and captured_piece.piece_type != chess.KING:
-            # CORECTARE: Culoarea care capturează este cea care tocmai a mutat
-            capturing_color = 'w' if not board.turn else 'b'  # board.turn s-a schimbat după push
-            captured_color = 'b' if capturing_color == 'w' else 'w'
-            piece_type_char = 'pnbrqk'[captured_piece.piece_type - 1]
-            
-            # Verifică că listele exist
-            if capturing_color not in game_state['hostages']:
-                game_state['hostages'][capturing_color] = []
-                
-            game_state['hostages'][capturing_color].append({
-                'type': piece_type_char,
-                'color': captured_color
-            })
-        
-        game_state['last_move'] = move_uci
+        # Execută mutarea prin istoric; piesa capturată devine ostatic
+        hostage = game_state['history'].push_move(game_state, move)
+        if hostage:
+            mark_changed(game_state, 'fen', 'hostages')
+        else:
+            mark_changed(game_state, 'fen')
         
         # Verifică starea jocului
-        game_over = False
-        game_result = None
+        game_over, game_result = update_game_over(game_state)
         
-        if board.is_checkmate():
-            game_over = True
-            game_result = 'checkmate'
-            game_state['game_status'] = 'finished'
-        elif board.is_stalemate():
-            game_over = True
-            game_result = 'stalemate'
-            game_state['game_status'] = 'finished'
-        elif board.is_insufficient_material():
-            game_over = True
-            game_result = 'insufficient_material'
-            game_state['game_status'] = 'finished'
-        elif board.is_fifty_moves():
-            game_over = True
-            game_result = '50_moves'
-            game_state['game_status'] = 'finished'
+        publish_move_events(game_id, game_state, move_uci, hostage, game_result)
         
-        return jsonify({
-            'success': True,
-            'fen': board.fen(),
-            'hostages': game_state['hostages'],
-            'reserves': game_state['reserves'],
-            'turn': 'w' if board.turn else 'b',
-            'check': board.is_check(),
-            'checkmate': board.is_checkmate(),
-            'draw': board.is_stalemate() or board.is_insufficient_material() or board.is_fifty_moves(),
+        response = {'success': True}
+        response.update(build_state_response(game_state, since_version))
+        response.update({
             'game_over': game_over,
             'game_result': game_result,
             'move_count': game_state['move_count']
         })
+        return jsonify(response)
         
     except Exception as e:
         # Log eroarea pentru debugging
@@ -128,6 +302,7 @@ def ai_move():
     try:
         game_id = request.json.get('game_id')
         difficulty = request.json.get('difficulty', 'medium')
+        since_version = get_since_version()
 
         if game_id not in games:
             return jsonify({'error': 'Game not found'}), 404
@@ -143,179 +318,207 @@ def ai_move():
         if board.turn != chess.BLACK:
             return jsonify({'error': 'Not AI turn'}), 400
 
-        # Verifică dacă există mutări legale
+        # Verifică dacă există acțiuni legale (în șah pot exista doar plasări care blochează)
         legal_moves = list(board.legal_moves)
-        if not legal_moves:
+        if not legal_moves and not hostage_rules.has_legal_action(game_state):
             return jsonify({'error': 'No legal moves available'}), 400
 
-        # Setează dificultatea AI-ului
-        old_depth = ai.depth
+        # Setează dificultatea AI-ului (adâncimea e per cerere, instanța ai e partajată)
+        depth = DIFFICULTY_DEPTHS.get(difficulty, ai.depth)
+
+        # Progresul căutării mutării normale e trimis pe canalul push
+        def report_progress(reached_depth, move, value):
+            event_bus.publish(game_id, 'ai_progress', {
+                'depth': reached_depth,
+                'max_depth': search_depth,
+                'move': move.uci() if move else None,
+                'value': value
+            })
+
+        # Căutările trec prin planificator: sub încărcare pot fi reduse sau respinse
         try:
-            if difficulty == 'easy':
-                ai.depth = 2
-            elif difficulty == 'medium':
-                ai.depth = 3
-            elif difficulty == 'hard':
-                ai.depth = 4
-
-            # Verifică mai întâi dacă AI-ul poate face un schimb avantajos de ostatici
-            exchange_result = try_ai_hostage_exchange(game_state)
-            if exchange_result.get('action') == 'exchange':
-                return jsonify(exchange_result)
-
-            # Dacă nu poate face schimb, încearcă să plaseze o piesă din rezerve
-            drop_result = try_ai_piece_drop(game_state)
-            if drop_result.get('action') == 'drop':
-                return jsonify(drop_result)
-
-            # Altfel, face o mutare normală
-            best_move, move_value = ai.get_best_move(game_state)
-
-            if best_move is None:
-                # Încearcă o mutare aleatorie dacă AI-ul nu găsește nimic
-                best_move = random.choice(legal_moves)
-
-            # Salvează piesa capturată ÎNAINTE de mutare
-            captured_piece = board.piece_at(best_move.to_square)
-            
-            # Execută mutarea
-            board.push(best_move)
-            game_state['move_count'] += 1
-
-            # Actualizează ostaticii dacă a fost captură
-            if captured_piece and captured_piece.piece_type != chess.KING:
-                capturing_color = 'b'  # AI-ul e negru
-                captured_color = 'w'   # Capturează piesele albe
-                piece_type_char = 'pnbrqk'[captured_piece.piece_type - 1]
-                
-                if capturing_color not in game_state['hostages']:
-                    game_state['hostages'][capturing_color] = []
-                    
-                game_state['hostages'][capturing_color].append({
-                    'type': piece_type_char,
-                    'color': captured_color
-                })
-
-            game_state['last_move'] = best_move.uci()
-
-            # Calculează notația SAN pentru afișare (cu protecție la erori)
-            move_san = best_move.uci()
-            try:
-                # Creează o copie temporară pentru a calcula SAN
-                temp_board = chess.Board()
-                temp_board.set_fen(board.fen())
-                # Trebuie să calculăm SAN înainte de mutare
-                temp_board = game_state['board'].copy()
-                temp_board.pop()  # Anulează ultima mutare temporar
-                move_san = temp_board.san(best_move)
-            except Exception as san_error:
-                print(f"Eroare la calcularea SAN: {san_error}")
-                pass
-
-            # Verifică starea jocului
-            game_over = False
-            game_result = None
-            
-            if board.is_checkmate():
-                game_over = True
-                game_result = 'checkmate'
-                game_state['game_status'] = 'finished'
-            elif board.is_stalemate():
-                game_over = True
-                game_result = 'stalemate'
-                game_state['game_status'] = 'finished'
-            elif board.is_insufficient_material():
-                game_over = True
-                game_result = 'insufficient_material'
-                game_state['game_status'] = 'finished'
-            elif board.is_fifty_moves():
-                game_over = True
-                game_result = '50_moves'
-                game_state['game_status'] = 'finished'
-
-            return jsonify({
-                'success': True,
-                'move': best_move.uci(),
-                'san': move_san,
-                'fen': board.fen(),
-                'hostages': game_state['hostages'],
-                'reserves': game_state['reserves'],
-                'turn': 'w' if board.turn else 'b',
-                'check': board.is_check(),
-                'checkmate': board.is_checkmate(),
-                'draw': board.is_stalemate() or board.is_insufficient_material() or board.is_fifty_moves(),
+            with search_scheduler.search_slot(depth) as search_depth:
+                # Cea mai bună mutare normală, căutată o singură dată: e referința pentru
+                # schimbul de ostatici și pentru plasarea din rezerve, care o înlocuiesc doar dacă sunt mai bune
+                session = get_engine_session(game_state)
+                # Iterative deepening doar dacă cineva urmărește progresul
+                progress = report_progress if event_bus.has_listeners(game_id) else None
+                best_move, move_value = ai.get_best_move(
+                    game_state, progress_callback=progress, depth=search_depth,
+                    session=session
+                )
+                normal_move = (best_move, move_value)
+                exchange_result = try_ai_hostage_exchange(game_state, depth=search_depth,
+                                                          normal_move=normal_move)
+                drop_result = {}
+                if exchange_result.get('action') != 'exchange':
+                    drop_result = try_ai_piece_drop(game_state, depth=search_depth, normal_move=normal_move)
+        except SchedulerBusy as e:
+            return busy_response(e)
+
+        if exchange_result.get('action') == 'exchange':
+            # Schimbul trece rândul, deci adversarul poate rămâne fără mutări
+            game_over, game_result = update_game_over(game_state)
+            publish_exchange_events(game_id, game_state, game_result)
+            # Starea (fen, ostatici, rezerve, rândul) și versiunea, ca la mutări
+            exchange_result.update(build_state_response(game_state, since_version))
+            exchange_result.update({
                 'game_over': game_over,
                 'game_result': game_result,
-                'move_count': game_state['move_count'],
-                'move_value': move_value  # Pentru debugging
+                'search_depth': search_depth
             })
-            
-        finally:
-            # Restaurează adâncimea originală
-            ai.depth = old_depth
+            return jsonify(exchange_result)
+
+        if drop_result.get('action') == 'drop':
+            # Piesa plasată poate da mat sau pat
+            game_over, game_result = update_game_over(game_state)
+            event_bus.publish(game_id, 'reserve', {
+                'action': 'drop',
+                'piece': drop_result['piece'],
+                'square': drop_result['square'],
+                'reserves': game_state['reserves']
+            })
+            publish_game_over(game_id, game_state, game_result)
+            drop_result.update(build_state_response(game_state, since_version))
+            drop_result.update({
+                'game_over': game_over,
+                'game_result': game_result,
+                'search_depth': search_depth
+            })
+            return jsonify(drop_result)
+
+        if best_move is None:
+            if not legal_moves:
+                # Doar un schimb dezavantajos ar fi fost posibil, iar AI-ul l-a refuzat
+                return jsonify({'error': 'No legal moves available'}), 400
+            # Încearcă o mutare aleatorie dacă AI-ul nu găsește nimic
+            best_move = random.choice(legal_moves)
+
+        # Execută mutarea prin istoric; piesa capturată devine ostatic
+        hostage = game_state['history'].push_move(game_state, best_move)
+        if hostage:
+            mark_changed(game_state, 'fen', 'hostages')
+        else:
+            mark_changed(game_state, 'fen')
+
+        # Calculează notația SAN pentru afișare (cu protecție la erori)
+        move_san = best_move.uci()
+        try:
+            # Creează o copie temporară pentru a calcula SAN
+            temp_board = chess.Board()
+            temp_board.set_fen(board.fen())
+            # Trebuie să calculăm SAN înainte de mutare
+            temp_board = game_state['board'].copy()
+            temp_board.pop()  # Anulează ultima mutare temporar
+            move_san = temp_board.san(best_move)
+        except Exception as san_error:
+            print(f"Eroare la calcularea SAN: {san_error}")
+            pass
+
+        # Verifică starea jocului
+        game_over, game_result = update_game_over(game_state)
+
+        publish_move_events(game_id, game_state, best_move.uci(), hostage, game_result)
+
+        response = {
+            'success': True,
+            'move': best_move.uci(),
+            'san': move_san
+        }
+        response.update(build_state_response(game_state, since_version))
+        response.update({
+            'game_over': game_over,
+            'game_result': game_result,
+            'move_count': game_state['move_count'],
+            'move_value': move_value,  # Pentru debugging
+            'search_depth': search_depth,  # Poate fi sub cea cerută când serverul e încărcat
+            'engine_session': session.stats()  # Refolosirea căutărilor anterioare, pentru debugging
+        })
+        return jsonify(response)
             
     except Exception as e:
         print(f"Eroare în ai_move: {str(e)}")
         return jsonify({'error': f'AI move error: {str(e)}'}), 500
 
-def try_ai_hostage_exchange(game_state):
-    """Încearcă să facă un schimb avantajos de ostatici pentru AI"""
+def busy_response(error):
+    """Răspuns 503 când planificatorul de căutări nu mai acceptă cereri"""
+    response = jsonify({
+        'error': 'Server busy, retry later',
+        'reason': error.reason,
+        'retry_after': error.retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def publish_move_events(game_id, game_state, move_uci, hostage=None, game_result=None):
+    """Publică pe canalul push evenimentele produse de o mutare"""
+    board = game_state['board']
+    event_bus.publish(game_id, 'move', {
+        'move': move_uci,
+        'fen': board.fen(),
+        'turn': 'w' if board.turn else 'b',
+        'check': get_position_status(game_state)['check'],
+        'move_count': game_state['move_count'],
+        'version': game_state.get('version', 0)
+    })
+
+    if hostage:
+        event_bus.publish(game_id, 'hostage', {
+            'captured': hostage,
+            'hostages': game_state['hostages']
+        })
+
+    publish_game_over(game_id, game_state, game_result)
+
+def publish_game_over(game_id, game_state, game_result):
+    """Publică sfârșitul jocului (dacă e cazul) și închide canalul push"""
+    if game_result:
+        event_bus.publish(game_id, 'game_over', {
+            'game_result': game_result,
+            'fen': game_state['board'].fen()
+        })
+        event_bus.close(game_id)
+
+def publish_exchange_events(game_id, game_state, game_result=None):
+    """Publică pe canalul push noile liste de ostatici și rezerve după un schimb"""
+    event_bus.publish(game_id, 'hostage', {'action': 'exchange', 'hostages': game_state['hostages']})
+    event_bus.publish(game_id, 'reserve', {'action': 'exchange', 'reserves': game_state['reserves']})
+    publish_game_over(game_id, game_state, game_result)
+
+def try_ai_hostage_exchange(game_state, ai_color='b', depth=None, engine=None, normal_move=None):
+    """
+    Încearcă să facă un schimb avantajos de ostatici pentru AI (implicit negru).
+    Decizia aparține motorului (implicit ai), prin should_make_hostage_exchange;
+    normal_move e cea mai bună mutare normală, dacă a fost deja căutată.
+    """
     try:
         board = game_state['board']
-        ai_color = 'b'  # AI-ul joacă cu negru
-        opponent_color = 'w'
+        opponent_color = 'w' if ai_color == 'b' else 'b'
         
-        ai_hostages = game_state['hostages'].get(ai_color, [])
-        opponent_hostages = game_state['hostages'].get(opponent_color, [])
+        # Schimbul consumă rândul AI-ului, deci nu e permis în afara rândului sau în șah
+        if board.turn != (chess.WHITE if ai_color == 'w' else chess.BLACK) or board.is_check():
+            return {'action': 'no_exchange', 'reason': 'Exchange not allowed now'}
         
-        if not ai_hostages or not opponent_hostages:
+        if not game_state['hostages'].get(ai_color) or not game_state['hostages'].get(opponent_color):
             return {'action': 'no_exchange', 'reason': 'No hostages available'}
         
-        piece_values = {'p': 1, 'n': 3, 'b': 3, 'r': 5, 'q': 9, 'k': 100}
-        
-        best_exchange = None
-        best_value = -1000
+        exchange = (engine or ai).should_make_hostage_exchange(game_state, ai_color, depth, normal_move)
         
-        for ai_idx, ai_hostage in enumerate(ai_hostages):
-            ai_value = piece_values.get(ai_hostage['type'].lower(), 0)
+        if exchange:
+            ai_piece = exchange['ai_piece']
+            opp_piece = exchange['opp_piece']
             
-            for opp_idx, opp_hostage in enumerate(opponent_hostages):
-                opp_value = piece_values.get(opp_hostage['type'].lower(), 0)
-                
-                # AI-ul poate schimba doar dacă piesa sa are valoare >= cu cea a adversarului
-                if ai_value >= opp_value:
-                    exchange_value = opp_value - ai_value
-                    
-                    if exchange_value > best_value:
-                        best_value = exchange_value
-                        best_exchange = (ai_idx, opp_idx, ai_hostage, opp_hostage)
-        
-        if best_exchange and best_value >= -2:  # Acceptă schimburi rezonabile
-            ai_idx, opp_idx, ai_piece, opp_piece = best_exchange
-            
-            # Execută schimbul cu validare
-            if ai_idx < len(game_state['hostages'][ai_color]):
-                game_state['hostages'][ai_color].pop(ai_idx)
-            if opp_idx < len(game_state['hostages'][opponent_color]):
-                game_state['hostages'][opponent_color].pop(opp_idx)
-            
-            # Adaugă piesa primită în rezerve
-            if ai_color not in game_state['reserves']:
-                game_state['reserves'][ai_color] = []
-                
-            game_state['reserves'][ai_color].append({
-                'type': opp_piece['type'],
-                'color': ai_color
-            })
+            # Execută schimbul prin istoric; piesa primită intră în rezerve
+            game_state['history'].push_exchange(game_state, ai_color, exchange['ai_idx'], exchange['opp_idx'])
+            mark_changed(game_state, 'fen', 'hostages', 'reserves')
             
             return {
                 'action': 'exchange',
                 'success': True,
                 'ai_exchanged': ai_piece,
                 'received': opp_piece,
-                'hostages': game_state['hostages'],
-                'reserves': game_state['reserves'],
-                'turn': 'w',  # Trece rândul la jucător după schimb
+                'move_value': exchange['value'],  # Pentru debugging
                 'message': f"AI a schimbat {get_piece_name(ai_piece['type'])} pentru {get_piece_name(opp_piece['type'])}"
             }
         
@@ -325,80 +528,53 @@ def try_ai_hostage_exchange(game_state):
         print(f"Eroare în try_ai_hostage_exchange: {str(e)}")
         return {'action': 'no_exchange', 'reason': f'Exchange error: {str(e)}'}
 
-def try_ai_piece_drop(game_state):
-    """Încearcă să plaseze o piesă din rezerve pe tablă"""
+def try_ai_piece_drop(game_state, ai_color='b', depth=None, engine=None, normal_move=None):
+    """
+    Încearcă să plaseze o piesă din rezerve pe tablă (AI-ul e implicit negru).
+    Piesa și pătratul sunt alese printr-o căutare scurtă a motorului (implicit ai),
+    iar plasarea e făcută doar dacă e mai bună decât cea mai bună mutare normală
+    (normal_move, dacă a fost deja căutată), prin should_drop_piece.
+    """
     try:
         board = game_state['board']
-        ai_color = 'b'  # AI-ul joacă cu negru
         
         ai_reserves = game_state['reserves'].get(ai_color, [])
         
         if not ai_reserves:
             return {'action': 'no_drop', 'reason': 'No pieces in reserves'}
         
-        # Alege cea mai valoroasă piesă din rezerve
-        piece_values = {'p': 1, 'n': 3, 'b': 3, 'r': 5, 'q': 9}
-        best_piece_idx = 0
-        best_value = 0
+        # Plasarea consumă rândul AI-ului, deci nu e permisă în afara rândului. În șah,
+        # drop_mask lasă doar plasările care blochează, folosite când nu există nicio mutare
+        if board.turn != (chess.WHITE if ai_color == 'w' else chess.BLACK):
+            return {'action': 'no_drop', 'reason': 'Drop not allowed now'}
+        if board.is_check() and any(board.generate_legal_moves()):
+            return {'action': 'no_drop', 'reason': 'Drop not allowed now'}
         
-        for idx, piece in enumerate(ai_reserves):
-            value = piece_values.get(piece['type'].lower(), 0)
-            if value > best_value:
-                best_value = value
-                best_piece_idx = idx
+        placement = (engine or ai).should_drop_piece(game_state, ai_color, depth, normal_move)
         
-        if best_piece_idx >= len(ai_reserves):
-            return {'action': 'no_drop', 'reason': 'Invalid piece index'}
+        if placement:
+            selected_piece = placement['piece']
+            target_square = placement['square']
             
-        selected_piece = ai_reserves[best_piece_idx]
-        
-        # Găsește o poziție strategică pentru plasare
-        target_square = find_best_drop_square(board, selected_piece['type'], ai_color)
-        
-        if target_square:
-            # Elimină piesa din rezerve
-            game_state['reserves'][ai_color].pop(best_piece_idx)
+            # Mută piesa din rezerve pe tablă prin istoric
+            game_state['history'].push_drop(game_state, ai_color, placement['piece_idx'], target_square)
+            mark_changed(game_state, 'fen', 'reserves')
             
             return {
                 'action': 'drop',
                 'success': True,
                 'piece': selected_piece,
                 'square': target_square,
-                'reserves': game_state['reserves'],
-                'turn': 'w',  # Trece rândul la jucător
+                'move_value': placement['value'],  # Pentru debugging
                 'message': f"AI a plasat {get_piece_name(selected_piece['type'])} pe {target_square}"
             }
         
-        return {'action': 'no_drop', 'reason': 'No suitable squares for drop'}
+        return {'action': 'no_drop', 'reason': 'No drop better than a normal move'}
         
     except Exception as e:
         print(f"Eroare în try_ai_piece_drop: {str(e)}")
         return {'action': 'no_drop', 'reason': f'Drop error: {str(e)}'}
 
-def find_best_drop_square(board, piece_type, color):
-    """Găsește cea mai bună poziție pentru plasarea unei piese"""
-    try:
-        # Pentru demonstrație, returnează o poziție validă goală
-        target_ranks = [1, 2] if color == 'b' else [6, 7]  # Rândurile aproape de baza AI-ului
-        
-        for rank in target_ranks:
-            for file in range(8):
-                square = chess.square(file, rank)
-                if not board.piece_at(square):
-                    square_name = chess.square_name(square)
-                    return square_name
-        
-        # Dacă nu găsește în rândurile preferate, caută oriunde
-        for square in chess.SQUARES:
-            if not board.piece_at(square):
-                return chess.square_name(square)
-        
-        return None
-        
-    except Exception as e:
-        print(f"Eroare în find_best_drop_square: {str(e)}")
-        return None
-
 def get_piece_name(piece_type):
     """Returnează numele piesei în română"""
     names = {
@@ -423,30 +599,29 @@ def new_ai_game():
             'difficulty': difficulty,
             'hostages': games[game_id]['hostages'],
             'reserves': games[game_id]['reserves'],
+            'version': games[game_id]['version'],
             'success': True
         }
 
         # Dacă jucătorul e negru, AI-ul (alb) face prima mutare
         if player_color == 'b':
-            old_depth = ai.depth
+            depth = DIFFICULTY_DEPTHS.get(difficulty, ai.depth)
             try:
-                if difficulty == 'easy':
-                    ai.depth = 2
-                elif difficulty == 'medium':
-                    ai.depth = 3
-                elif difficulty == 'hard':
-                    ai.depth = 4
-
-                best_move, _ = ai.get_best_move(games[game_id])
-
-                if best_move:
-                    games[game_id]['board'].push(best_move)
-                    games[game_id]['last_move'] = best_move.uci()
-                    games[game_id]['move_count'] += 1
-                    response_data['initial_ai_move'] = best_move.uci()
-                    response_data['fen'] = games[game_id]['board'].fen()
-            finally:
-                ai.depth = old_depth
+                with search_scheduler.search_slot(depth) as search_depth:
+                    best_move, _ = ai.get_best_move(
+                        games[game_id], depth=search_depth, session=get_engine_session(games[game_id])
+                    )
+            except SchedulerBusy as e:
+                del games[game_id]
+                return busy_response(e)
+
+            if best_move:
+                games[game_id]['history'].push_move(games[game_id], best_move)
+                mark_changed(games[game_id], 'fen')
+                response_data['initial_ai_move'] = best_move.uci()
+                response_data['fen'] = games[game_id]['board'].fen()
+                response_data['version'] = games[game_id]['version']
+                publish_move_events(game_id, games[game_id], best_move.uci())
 
         return jsonify(response_data)
         
@@ -461,33 +636,350 @@ def get_game_status(game_id):
         return jsonify({'error': 'Game not found'}), 404
     
     game_state = games[game_id]
-    board = game_state['board']
     
-    return jsonify({
-        'game_id': game_id,
-        'fen': board.fen(),
-        'hostages': game_state['hostages'],
-        'reserves': game_state['reserves'],
-        'turn': 'w' if board.turn else 'b',
-        'check': board.is_check(),
-        'checkmate': board.is_checkmate(),
-        'draw': board.is_stalemate() or board.is_insufficient_material() or board.is_fifty_moves(),
+    # ETag-ul se schimbă doar când se schimbă versiunea jocului
+    etag = f"{game_id}-{game_state.get('version', 0)}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    response_data = {'game_id': game_id}
+    response_data.update(build_state_response(game_state))
+    response_data.update({
         'game_status': game_state.get('game_status', 'active'),
         'move_count': game_state.get('move_count', 0),
         'last_move': game_state.get('last_move')
     })
+    
+    response = jsonify(response_data)
+    response.set_etag(etag)
+    return response
+
+@app.route('/game_events/<game_id>', methods=['GET'])
+def game_events(game_id):
+    """
+    Flux Server-Sent Events cu mutările, ostaticii, rezervele și progresul AI-ului.
+    Clientul poate relua fluxul prin header-ul Last-Event-ID sau parametrul ?since=.
+    """
+    if game_id not in games:
+        return jsonify({'error': 'Game not found'}), 404
+
+    last_seq = request.headers.get('Last-Event-ID') or request.args.get('since', '0')
+    try:
+        last_seq = int(last_seq)
+    except ValueError:
+        return jsonify({'error': 'Invalid sequence number'}), 400
+
+    def snapshot():
+        game_state = games[game_id]
+        return {
+            'fen': game_state['board'].fen(),
+            'hostages': game_state['hostages'],
+            'reserves': game_state['reserves'],
+            'game_status': game_state.get('game_status', 'active'),
+            'move_count': game_state.get('move_count', 0),
+            'last_move': game_state.get('last_move')
+        }
+
+    return Response(
+        stream_with_context(event_bus.stream(game_id, last_seq, snapshot)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def step_history(game_id, game_state, direction, count):
+    """Aplică undo sau redo de `count` ori și returnează câte pași s-au făcut"""
+    history = game_state['history']
+    step = history.undo if direction == 'undo' else history.redo
+
+    steps = 0
+    while steps < count and step(game_state) is not None:
+        steps += 1
+
+    if steps:
+        mark_changed(game_state, 'fen', 'hostages', 'reserves')
+        # Poziția poate să nu mai fie finală (ex. undo după mat)
+        game_state['game_status'] = 'active'
+        update_game_over(game_state)
+        event_bus.reopen(game_id)
+        event_bus.publish(game_id, direction, {
+            'steps': steps,
+            'fen': game_state['board'].fen(),
+            'hostages': game_state['hostages'],
+            'reserves': game_state['reserves'],
+            'version': game_state['version']
+        })
+    return steps
+
+@app.route('/undo', methods=['POST'])
+@app.route('/redo', methods=['POST'])
+def undo_redo():
+    """Anulează sau reaplică ultimele `count` evenimente din istoricul jocului"""
+    try:
+        game_id = request.json.get('game_id')
+        direction = request.path.strip('/')
+
+        if game_id not in games:
+            return jsonify({'error': 'Game not found'}), 404
+
+        try:
+            count = int(request.json.get('count', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid count'}), 400
+
+        game_state = games[game_id]
+        steps = step_history(game_id, game_state, direction, count)
+        if not steps:
+            return jsonify({'error': f'Nothing to {direction}'}), 400
+
+        history = game_state['history']
+        response = {'success': True, 'steps': steps}
+        response.update(build_state_response(game_state))
+        response.update({
+            'game_status': game_state['game_status'],
+            'move_count': game_state['move_count'],
+            'last_move': game_state['last_move'],
+            'can_undo': history.can_undo(),
+            'can_redo': history.can_redo()
+        })
+        return jsonify(response)
+
+    except Exception as e:
+        print(f"Eroare în undo_redo: {str(e)}")
+        return jsonify({'error': f'History error: {str(e)}'}), 500
+
+@app.route('/history/<game_id>', methods=['GET'])
+def get_history(game_id):
+    """
+    Returnează jurnalul de evenimente al jocului. Cu ?ply=N returnează și
+    poziția reconstruită după primele N evenimente.
+    """
+    if game_id not in games:
+        return jsonify({'error': 'Game not found'}), 404
+
+    history = games[game_id]['history']
+    response = {
+        'game_id': game_id,
+        'events': history.to_list(),
+        'cursor': history.cursor
+    }
+
+    ply = request.args.get('ply')
+    if ply is not None:
+        try:
+            past_state = history.state_at(int(ply))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid ply: {str(e)}'}), 400
+        response['position'] = {
+            'ply': int(ply),
+            'fen': past_state['board'].fen(),
+            'hostages': past_state['hostages'],
+            'reserves': past_state['reserves'],
+            'move_count': past_state['move_count'],
+            'last_move': past_state['last_move']
+        }
+
+    return jsonify(response)
+
+@app.route('/export/<game_id>', methods=['GET'])
+def export_game(game_id):
+    """Exportă jocul în format PGN extins pentru Hostage Chess"""
+    if game_id not in games:
+        return jsonify({'error': 'Game not found'}), 404
+
+    record = game_archive.game_record(games[game_id], {'GameId': game_id})
+    return Response(game_archive.record_to_pgn(record), mimetype='application/x-chess-pgn')
+
+def import_games(path):
+    """
+    Încarcă în memorie jocurile dintr-o arhivă (.pgn sau binară), citită în flux.
+    Returnează lista de game_id-uri create.
+    """
+    is_pgn = path.endswith('.pgn')
+    imported = []
+    with open(path, 'r' if is_pgn else 'rb', encoding='utf-8' if is_pgn else None) as fp:
+        records = game_archive.read_pgn(fp) if is_pgn else game_archive.read_binary(fp)
+        for record in records:
+            game_state = game_archive.replay_events(record['events'], create_new_game())
+            game_state['version'] = 1
+            game_state['field_versions'] = {'fen': 1, 'hostages': 1, 'reserves': 1}
+            update_game_over(game_state)
+
+            game_id = record['headers'].get('GameId')
+            while not game_id or game_id in games:
+                game_id = str(random.randint(1000, 9999))
+            games[game_id] = game_state
+            imported.append(game_id)
+    return imported
+
+@app.route('/legal_moves/<game_id>', methods=['GET'])
+def legal_moves(game_id):
+    """
+    Toate acțiunile legale ale jucătorului la mutare: mutări grupate după pătratul
+    de plecare, pătratele de plasare pentru fiecare piesă din rezerve și schimburile
+    de ostatici valide. Răspunsul are ETag-ul versiunii jocului.
+    """
+    if game_id not in games:
+        return jsonify({'error': 'Game not found'}), 404
+
+    game_state = games[game_id]
+    etag = f"{game_id}-{game_state.get('version', 0)}-actions"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response_data = {'game_id': game_id, 'version': game_state.get('version', 0)}
+    if game_state.get('game_status') == 'active':
+        response_data.update(get_legal_actions(game_state))
+    else:
+        response_data.update({'moves': {}, 'drops': {}, 'exchanges': []})
+
+    response = jsonify(response_data)
+    response.set_etag(etag)
+    return response
+
+@app.route('/analyze_batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analizează în lot poziții (FEN + ostatici + rezerve). Răspunsul este NDJSON:
+    câte o linie per poziție, în ordinea de intrare, urmată de o linie 'summary'
+    cu throughput-ul în poziții pe secundă.
+    """
+    try:
+        positions = request.json.get('positions')
+        depth = int(request.json.get('depth', 0))
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Invalid batch request'}), 400
+
+    if not isinstance(positions, list) or not positions:
+        return jsonify({'error': 'positions must be a non-empty list'}), 400
+    if len(positions) > MAX_BATCH_POSITIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_POSITIONS} positions per request'}), 400
+    if depth < 0 or depth > MAX_BATCH_DEPTH:
+        return jsonify({'error': f'depth must be between 0 and {MAX_BATCH_DEPTH}'}), 400
+
+    # Analiza trece prin planificator ca orice căutare, ocupând câte un loc per proces din pool;
+    # adâncimea poate fi redusă sub încărcare
+    try:
+        search_depth = min(depth, search_scheduler.acquire(depth, BATCH_PROCESSES))
+    except SchedulerBusy as e:
+        return busy_response(e)
+    started_at = time.perf_counter()
+
+    def generate():
+        stats = {}
+        results = batch_analysis.analyze_positions(
+            positions, depth=search_depth, processes=BATCH_PROCESSES, stats=stats,
+            executor=batch_analysis.shared_pool(BATCH_PROCESSES)
+        )
+        for result in results:
+            yield json.dumps(result) + '\n'
+        stats['depth'] = search_depth
+        yield json.dumps({'summary': stats}) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Locul în planificator e eliberat când răspunsul se închide (inclusiv la deconectare)
+    response.call_on_close(lambda: search_scheduler.release(started_at, BATCH_PROCESSES))
+    return response
+
+@app.route('/analyze_multipv', methods=['POST'])
+def analyze_multipv():
+    """
+    Analiză multi-PV a poziției curente a unui joc: cele mai bune `lines` mutări,
+    cu variantele principale și scorurile. Răspunsul este NDJSON, câte o linie
+    pentru fiecare adâncime completă, pe măsură ce căutarea avansează.
+    """
+    try:
+        game_id = request.json.get('game_id')
+        lines_count = int(request.json.get('lines', 3))
+        depth = int(request.json.get('depth', ai.depth))
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Invalid analysis request'}), 400
+
+    if game_id not in games:
+        return jsonify({'error': 'Game not found'}), 404
+    if not 1 <= lines_count <= MAX_MULTIPV_LINES:
+        return jsonify({'error': f'lines must be between 1 and {MAX_MULTIPV_LINES}'}), 400
+    if not 1 <= depth <= MAX_MULTIPV_DEPTH:
+        return jsonify({'error': f'depth must be between 1 and {MAX_MULTIPV_DEPTH}'}), 400
+
+    game_state = games[game_id]
+    if hostage_rules.is_game_over(game_state):
+        return jsonify({'error': 'No legal moves available'}), 400
+
+    # Analiza lucrează pe o copie, ca mutările jucate între timp să nu o afecteze
+    analysis_state = {
+        'board': game_state['board'].copy(),
+        'hostages': deepcopy(game_state['hostages']),
+        'reserves': deepcopy(game_state['reserves'])
+    }
+
+    try:
+        search_depth = search_scheduler.acquire(depth)
+    except SchedulerBusy as e:
+        return busy_response(e)
+    started_at = time.perf_counter()
+
+    def generate():
+        # Fiecare adâncime completă e trimisă clientului imediat
+        board = analysis_state['board']
+        for reached_depth, lines in ai.iter_top_moves(analysis_state, lines_count, search_depth):
+            yield json.dumps({
+                'depth': reached_depth,
+                'max_depth': search_depth,
+                'lines': [
+                    {
+                        'move': line['move'].uci(),
+                        'san': board.san(line['move']),
+                        'value': line['value'],
+                        'pv': [move.uci() for move in line['pv']]
+                    }
+                    for line in lines
+                ]
+            }) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Locul în planificator e eliberat când răspunsul se închide (inclusiv la deconectare)
+    response.call_on_close(lambda: search_scheduler.release(started_at))
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Metrici ale serverului: coada de căutări AI și numărul de jocuri"""
+    return jsonify({
+        'search_scheduler': search_scheduler.metrics(),
+        'games': len(games),
+        'game_store': games.metrics(),
+        'engine_sessions': session_budget.metrics()
+    })
 
 @app.route('/ai_exchange_hostage', methods=['POST'])
 def ai_exchange_hostage():
     """Endpoint separat pentru schimbul de ostatici AI (opțional)"""
     try:
         game_id = request.json.get('game_id')
+        since_version = get_since_version()
 
         if game_id not in games:
             return jsonify({'error': 'Game not found'}), 404
 
         game_state = games[game_id]
-        result = try_ai_hostage_exchange(game_state)
+        if game_state.get('game_status') != 'active':
+            return jsonify({'error': 'Game is not active'}), 400
+
+        # Decizia schimbului implică o căutare scurtă, deci trece prin planificator
+        try:
+            with search_scheduler.search_slot(ai.depth) as search_depth:
+                result = try_ai_hostage_exchange(game_state, depth=search_depth)
+        except SchedulerBusy as e:
+            return busy_response(e)
+        if result.get('action') == 'exchange':
+            game_over, game_result = update_game_over(game_state)
+            publish_exchange_events(game_id, game_state, game_result)
+            result.update(build_state_response(game_state, since_version))
+            result.update({'game_over': game_over, 'game_result': game_result})
         
         return jsonify(result)
         
@@ -0,0 +1,180 @@
+"""
+Analiză în lot a pozițiilor de Hostage Chess.
+
+Primește multe stări (FEN + ostatici + rezerve) și returnează evaluarea statică
+(depth=0) sau rezultatul unei căutări scurte (depth>0). Pozițiile sunt grupate
+în loturi și distribuite pe un pool de procese; rezultatele sunt produse în flux,
+în ordinea de intrare, cu un număr limitat de loturi în lucru (memorie constantă).
+Serverul folosește un singur pool comun (shared_pool), nu câte unul per cerere.
+
+Exemplu:
+    python batch_analysis.py pozitii.ndjson --depth 1 --processes 4 > rezultate.ndjson
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import chess
+
+from hostage_rules import is_game_over
+from minimax_ai import MinimaxAI
+
+_worker_ai = None
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def _get_ai():
+    # Fiecare proces își creează o singură instanță de AI
+    global _worker_ai
+    if _worker_ai is None:
+        _worker_ai = MinimaxAI()
+    return _worker_ai
+
+
+def shared_pool(processes):
+    """
+    Pool-ul de procese comun al serverului, creat la prima cerere și refolosit,
+    ca cererile simultane să nu pornească fiecare câte un pool. Procesele sunt
+    pornite prin 'spawn': fork dintr-un server cu mai multe fire poate moșteni
+    lock-uri blocate.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        # Un pool stricat (un proces mort) nu mai acceptă loturi și este înlocuit
+        if _shared_pool is None or getattr(_shared_pool, '_broken', False):
+            _shared_pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _shared_pool
+
+
+def _parse_position(position):
+    """Construiește starea jocului dintr-o poziție de intrare."""
+    hostages = position.get('hostages') or {}
+    reserves = position.get('reserves') or {}
+    return {
+        'board': chess.Board(position['fen']),
+        'hostages': {'w': hostages.get('w', []), 'b': hostages.get('b', [])},
+        'reserves': {'w': reserves.get('w', []), 'b': reserves.get('b', [])}
+    }
+
+
+def analyze_chunk(positions, depth=0):
+    """Analizează un lot de poziții în procesul curent."""
+    ai = _get_ai()
+    results = []
+    game_states = []
+    for position in positions:
+        result = {'id': position.get('id')}
+        try:
+            game_states.append((result, _parse_position(position)))
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            result['error'] = f'Invalid position: {str(e)}'
+        results.append(result)
+
+    if depth <= 0:
+        values = ai.evaluate_positions([game_state for _, game_state in game_states])
+        for (result, _), value in zip(game_states, values):
+            result['evaluation'] = value
+    else:
+        for result, game_state in game_states:
+            if is_game_over(game_state):
+                result['evaluation'] = ai.evaluate_positions([game_state])[0]
+                continue
+            best_move, value = ai.get_best_move(game_state, depth=depth)
+            result['best_move'] = best_move.uci() if best_move else None
+            result['value'] = value
+    return results
+
+
+def analyze_positions(positions, depth=0, processes=None, chunk_size=64, stats=None, executor=None):
+    """
+    Generator: analizează pozițiile în loturi și produce rezultatele în ordine.
+
+    Args:
+        positions (iterable): dict-uri cu 'fen', opțional 'hostages', 'reserves', 'id'.
+        depth (int): 0 pentru evaluare statică, altfel adâncimea căutării.
+        processes (int): Numărul de procese; 1 rulează în procesul curent.
+        chunk_size (int): Numărul de poziții dintr-un lot.
+        stats (dict, opțional): Completat la final cu 'positions', 'seconds',
+            'positions_per_second'.
+        executor (ProcessPoolExecutor, opțional): Pool existent (ex. shared_pool);
+            nu e închis la final. Implicit se creează un pool cu `processes` procese.
+    """
+    processes = processes or os.cpu_count() or 1
+    iterator = iter(positions)
+    chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+    count = 0
+    start = time.perf_counter()
+
+    if processes == 1 and executor is None:
+        for chunk in chunks:
+            for result in analyze_chunk(chunk, depth):
+                count += 1
+                yield result
+    else:
+        owned = executor is None
+        if owned:
+            executor = ProcessPoolExecutor(max_workers=processes)
+        # Cel mult 2 loturi în lucru per proces, ca memoria să nu crească cu intrarea
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(analyze_chunk, chunk, depth))
+                if len(pending) >= processes * 2:
+                    for result in pending.popleft().result():
+                        count += 1
+                        yield result
+            while pending:
+                for result in pending.popleft().result():
+                    count += 1
+                    yield result
+        finally:
+            # La întreruperea fluxului (ex. clientul s-a deconectat) loturile neîncepute sunt anulate
+            for future in pending:
+                future.cancel()
+            if owned:
+                executor.shutdown()
+
+    if stats is not None:
+        seconds = time.perf_counter() - start
+        stats.update({
+            'positions': count,
+            'seconds': seconds,
+            'positions_per_second': count / seconds if seconds else 0.0
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analiză în lot a pozițiilor de Hostage Chess')
+    parser.add_argument('input', help='Fișier NDJSON cu poziții ("-" pentru stdin)')
+    parser.add_argument('--depth', type=int, default=0, help='0 = evaluare statică')
+    parser.add_argument('--processes', type=int, default=None, help='Numărul de procese')
+    parser.add_argument('--chunk-size', type=int, default=64, help='Poziții per lot')
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    try:
+        positions = (json.loads(line) for line in source if line.strip())
+        stats = {}
+        for result in analyze_positions(positions, args.depth, args.processes, args.chunk_size, stats):
+            sys.stdout.write(json.dumps(result) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    print(f"{stats['positions']} poziții în {stats['seconds']:.2f}s "
+          f"({stats['positions_per_second']:.1f} poziții/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
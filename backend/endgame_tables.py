@@ -0,0 +1,427 @@
+"""
+Tabele de final pentru Hostage Chess, generate prin analiză retrogradă.
+
+Fiecare tabelă acoperă regele și o piesă (damă, tură sau pion) contra regelui
+singur, cu piesa fie pe tablă, fie în rezervele părții mai puternice. Pentru
+fiecare poziție se reține rezultatul (câștig/remiză/pierdere) și distanța până la
+mat, în semimutări, din perspectiva jucătorului la mutare.
+
+Format (un fișier per tabelă, ex. KQK.hctb):
+    antet de 12 octeți: MAGIC, versiunea, tipul piesei, 2 octeți rezervați,
+        numărul de intrări (uint32 little-endian)
+    câte un octet per poziție, la indexul
+        ((partea la mutare * 64 + regele tare) * 64 + regele slab) * 65 + locul piesei
+    unde partea la mutare e 0 pentru partea tare, iar locul piesei e pătratul ei
+    sau 64 dacă e în rezerve. Partea tare e mereu albă; pozițiile cu partea tare
+    neagră sunt oglindite la interogare.
+    Octetul: 0 = remiză sau poziție ilegală, 1-127 = jucătorul la mutare câștigă
+    în atâtea semimutări, 128 + d = jucătorul la mutare primește mat în d semimutări.
+
+Nebunul și calul singuri sunt remiză (material insuficient) și nu au tabele.
+Tabela de pioni folosește tabelele de damă și tură pentru promovări, deci se
+generează ultima.
+
+Exemple:
+    python endgame_tables.py generate --dir tables
+    python endgame_tables.py probe "8/8/8/4k3/8/8/8/4K3 w - - 0 1" --reserve-w q
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+import chess
+
+MAGIC = b'HCTB'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sBc2xI')
+
+# Ordinea generării: promovările pionului au nevoie de tabelele de damă și tură
+TABLE_PIECES = ('q', 'r', 'p')
+
+RESERVE = 64
+ENTRIES = 2 * 64 * 64 * 65
+LOSS = 128
+
+# Scorul unei poziții câștigate din tabele; sub scorul matului (10000) din evaluare
+TB_WIN = 9000
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+
+
+def table_name(piece_type):
+    return f'K{piece_type.upper()}K.hctb'
+
+
+def table_index(stm, strong_king, weak_king, location):
+    """Indexul unei poziții; stm e 0 când partea tare e la mutare."""
+    return ((stm * 64 + strong_king) * 64 + weak_king) * 65 + location
+
+
+def decode(value):
+    """
+    Decodifică un octet din tabelă.
+
+    Returns:
+        tuple: (rezultat, semimutări), rezultatul fiind 1 (câștig pentru jucătorul
+            la mutare), 0 (remiză) sau -1 (pierdere).
+    """
+    if value == 0:
+        return 0, 0
+    if value < LOSS:
+        return 1, value
+    return -1, value - LOSS
+
+
+def _piece_attacks(piece_type, square, occupied):
+    """Atacurile unei piese albe, din tabelele precalculate ale python-chess."""
+    if piece_type == 'p':
+        return chess.BB_PAWN_ATTACKS[chess.WHITE][square]
+    attacks = chess.BB_EMPTY
+    if piece_type == 'q':
+        attacks |= chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+    return attacks | (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+                      | chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied])
+
+
+def _successors(piece_type, stm, strong_king, weak_king, location, solved):
+    """
+    Succesorii legali ai unei poziții.
+
+    Returns:
+        tuple: (indicii succesorilor din aceeași tabelă, valorile succesorilor din
+            alte tabele sau None pentru remiză, dacă jucătorul la mutare e în șah)
+        sau None dacă poziția e ilegală.
+    """
+    king_bb = chess.BB_SQUARES[strong_king]
+    weak_bb = chess.BB_SQUARES[weak_king]
+    piece_bb = chess.BB_SQUARES[location] if location != RESERVE else chess.BB_EMPTY
+    occupied = king_bb | weak_bb | piece_bb
+
+    if strong_king == weak_king or chess.BB_KING_ATTACKS[strong_king] & weak_bb or piece_bb & (king_bb | weak_bb):
+        return None
+    if piece_type == 'p' and piece_bb & (chess.BB_RANK_1 | chess.BB_RANK_8):
+        return None
+
+    internal = []
+    external = []
+
+    if stm == 0:
+        # Regele slab nu poate fi în șah cu partea tare la mutare
+        if piece_bb and _piece_attacks(piece_type, location, occupied) & weak_bb:
+            return None
+
+        safe = chess.BB_KING_ATTACKS[strong_king] & ~chess.BB_KING_ATTACKS[weak_king] & ~piece_bb
+        for target in chess.scan_forward(safe):
+            internal.append(table_index(1, target, weak_king, location))
+
+        if location == RESERVE:
+            mask = ~occupied & chess.BB_ALL
+            if piece_type == 'p':
+                mask &= ~(chess.BB_RANK_1 | chess.BB_RANK_8)
+            for target in chess.scan_forward(mask):
+                internal.append(table_index(1, strong_king, weak_king, target))
+        elif piece_type == 'p':
+            push = location + 8
+            if not chess.BB_SQUARES[push] & occupied:
+                if push >= chess.A8:
+                    for promotion in ('q', 'r', 'b', 'n'):
+                        table = solved.get(promotion)
+                        external.append(table[table_index(1, strong_king, weak_king, push)] if table else None)
+                else:
+                    internal.append(table_index(1, strong_king, weak_king, push))
+                    if location < chess.A3 and not chess.BB_SQUARES[push + 8] & occupied:
+                        internal.append(table_index(1, strong_king, weak_king, push + 8))
+        else:
+            for target in chess.scan_forward(_piece_attacks(piece_type, location, occupied) & ~king_bb):
+                internal.append(table_index(1, strong_king, weak_king, target))
+        return internal, external, False
+
+    # Partea slabă are doar regele; liniile pieselor care alunecă trec prin pătratul lui
+    attacked = chess.BB_KING_ATTACKS[strong_king]
+    if piece_bb:
+        attacked |= _piece_attacks(piece_type, location, occupied & ~weak_bb)
+    for target in chess.scan_forward(chess.BB_KING_ATTACKS[weak_king] & ~attacked & ~king_bb):
+        if target == location:
+            # Piesa capturată devine ostatic, dar partea tare nu are ostatici de schimbat: remiză
+            external.append(None)
+        else:
+            internal.append(table_index(0, strong_king, target, location))
+    in_check = bool(piece_bb and _piece_attacks(piece_type, location, occupied) & weak_bb)
+    return internal, external, in_check
+
+
+def generate_table(piece_type, solved=None, progress=None):
+    """
+    Generează tabela pentru regele și piece_type contra regelui.
+
+    Args:
+        piece_type (str): 'q', 'r' sau 'p'.
+        solved (dict, opțional): Tabelele deja generate, după tipul piesei
+            (necesare pentru promovările pionului).
+        progress (callable, opțional): Apelată cu un mesaj la fiecare etapă.
+
+    Returns:
+        bytearray: ENTRIES octeți codificați ca în antetul modulului.
+    """
+    solved = solved or {}
+    values = bytearray(ENTRIES)
+    resolved = bytearray(ENTRIES)
+    remaining = array('H', [0]) * ENTRIES
+
+    # Graful succesorilor, stocat compact (CSR), apoi inversat pentru analiza retrogradă
+    offsets = array('i', [0])
+    edges = array('i')
+    levels = [[]]
+    external_events = {}
+
+    for index in range(ENTRIES):
+        location = index % 65
+        rest = index // 65
+        weak_king = rest % 64
+        rest //= 64
+        strong_king = rest % 64
+        stm = rest // 64
+
+        result = _successors(piece_type, stm, strong_king, weak_king, location, solved)
+        if result is None:
+            resolved[index] = 1
+            offsets.append(len(edges))
+            continue
+
+        internal, external, in_check = result
+        edges.extend(internal)
+        offsets.append(len(edges))
+        remaining[index] = len(internal) + len(external)
+
+        if not internal and not external:
+            resolved[index] = 1
+            if in_check:
+                values[index] = LOSS
+                levels[0].append(index)
+            continue
+
+        for value in external:
+            if value:
+                outcome, plies = decode(value)
+                external_events.setdefault(plies, []).append((index, outcome))
+
+    if progress:
+        progress(f'{piece_type}: {len(edges)} mutări, inversarea grafului')
+
+    predecessor_offsets = array('i', [0]) * (ENTRIES + 1)
+    for child in edges:
+        predecessor_offsets[child + 1] += 1
+    for index in range(ENTRIES):
+        predecessor_offsets[index + 1] += predecessor_offsets[index]
+    predecessors = array('i', [0]) * len(edges)
+    fill = predecessor_offsets[:ENTRIES]
+    for parent in range(ENTRIES):
+        for position in range(offsets[parent], offsets[parent + 1]):
+            child = edges[position]
+            predecessors[fill[child]] = parent
+            fill[child] += 1
+    del edges, offsets, fill
+
+    def resolve_parent(parent, child_lost, plies):
+        # Un copil pierdut înseamnă câștig; pierderea vine abia când toți copiii sunt câștigați
+        if resolved[parent]:
+            return
+        if child_lost:
+            values[parent] = plies + 1
+        else:
+            remaining[parent] -= 1
+            if remaining[parent]:
+                return
+            values[parent] = LOSS + plies + 1
+        if plies + 1 >= LOSS:
+            raise ValueError(f'Distanța până la mat depășește {LOSS - 1} semimutări')
+        resolved[parent] = 1
+        while len(levels) <= plies + 1:
+            levels.append([])
+        levels[plies + 1].append(parent)
+
+    plies = 0
+    while plies < len(levels) or external_events:
+        while len(levels) <= plies:
+            levels.append([])
+        for parent, outcome in external_events.pop(plies, []):
+            resolve_parent(parent, outcome < 0, plies)
+        for child in levels[plies]:
+            child_lost = values[child] >= LOSS
+            for position in range(predecessor_offsets[child], predecessor_offsets[child + 1]):
+                resolve_parent(predecessors[position], child_lost, plies)
+        if progress and levels[plies]:
+            progress(f'{piece_type}: {len(levels[plies])} poziții la {plies} semimutări')
+        plies += 1
+
+    return values
+
+
+def write_table(path, piece_type, values):
+    with open(path, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, piece_type.encode('ascii'), len(values)))
+        fp.write(values)
+
+
+def generate_all(directory=DEFAULT_DIR, progress=None):
+    """Generează toate tabelele în directory, în ordinea din TABLE_PIECES."""
+    os.makedirs(directory, exist_ok=True)
+    solved = {}
+    for piece_type in TABLE_PIECES:
+        start = time.perf_counter()
+        solved[piece_type] = generate_table(piece_type, solved, progress)
+        path = os.path.join(directory, table_name(piece_type))
+        write_table(path, piece_type, solved[piece_type])
+        if progress:
+            progress(f'{path}: {time.perf_counter() - start:.1f}s')
+
+
+class EndgameTables:
+    """Tabelele de final dintr-un director, citite prin mmap la cerere."""
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self.tables = {}
+        self.probes = 0
+        self.hits = 0
+        if not os.path.isdir(directory):
+            return
+        for piece_type in TABLE_PIECES:
+            path = os.path.join(directory, table_name(piece_type))
+            if os.path.exists(path):
+                self.tables[piece_type] = self._open(path, piece_type)
+
+    def _open(self, path, piece_type):
+        with open(path, 'rb') as fp:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, stored_type, entries = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION or stored_type.decode('ascii') != piece_type:
+            raise ValueError(f'Invalid endgame table: {path}')
+        if entries != ENTRIES or len(data) != HEADER.size + ENTRIES:
+            raise ValueError(f'Truncated endgame table: {path}')
+        return data
+
+    def probe(self, game_state):
+        """
+        Caută poziția în tabele.
+
+        Returns:
+            tuple: (rezultat, semimutări) din perspectiva jucătorului la mutare
+                (vezi decode) sau None dacă poziția nu e acoperită.
+        """
+        board = game_state['board']
+        # Calea rapidă: mai mult de trei piese pe tablă sau nicio tabelă încărcată
+        if not self.tables or chess.popcount(board.occupied) > 3:
+            return None
+        if board.castling_rights:
+            return None
+        self.probes += 1
+
+        reserves = game_state['reserves']
+        hostages = game_state['hostages']
+        others = board.occupied & ~board.kings
+        if others:
+            if reserves.get('w') or reserves.get('b'):
+                return None
+            location = chess.msb(others)
+            piece = board.piece_at(location)
+            strong = piece.color
+            piece_type = piece.symbol().lower()
+        else:
+            if len(reserves.get('w', [])) + len(reserves.get('b', [])) != 1:
+                return None
+            strong = chess.WHITE if reserves.get('w') else chess.BLACK
+            location = RESERVE
+            piece_type = (reserves['w'] or reserves['b'])[0]['type'].lower()
+
+        # Cu ostatici ai părții tari, captura piesei ar permite un schimb
+        if hostages.get('w' if strong == chess.WHITE else 'b'):
+            return None
+        table = self.tables.get(piece_type)
+        if table is None:
+            return None
+
+        strong_king = board.king(strong)
+        weak_king = board.king(not strong)
+        if strong == chess.BLACK:
+            # Partea tare e mereu albă în tabele: oglindire pe verticală
+            strong_king ^= 56
+            weak_king ^= 56
+            if location != RESERVE:
+                location ^= 56
+        stm = 0 if board.turn == strong else 1
+
+        value = table[HEADER.size + table_index(stm, strong_king, weak_king, location)]
+        self.hits += 1
+        return decode(value)
+
+    def evaluate(self, game_state):
+        """Scorul poziției din tabele (pozitiv = avantaj alb) sau None dacă nu e acoperită."""
+        found = self.probe(game_state)
+        if found is None:
+            return None
+        outcome, plies = found
+        if outcome == 0:
+            return 0.0
+        score = TB_WIN - plies
+        white_to_move = game_state['board'].turn == chess.WHITE
+        return score if (outcome > 0) == white_to_move else -score
+
+    def close(self):
+        for data in self.tables.values():
+            data.close()
+        self.tables = {}
+
+
+_default_tables = None
+
+
+def default_tables():
+    """Tabelele din DEFAULT_DIR, deschise o singură dată per proces."""
+    global _default_tables
+    if _default_tables is None:
+        _default_tables = EndgameTables(DEFAULT_DIR)
+    return _default_tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tabele de final pentru Hostage Chess')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help='Generează tabelele prin analiză retrogradă')
+    generate.add_argument('--dir', default=DEFAULT_DIR, help='Directorul tabelelor')
+
+    probe = subparsers.add_parser('probe', help='Interoghează o poziție')
+    probe.add_argument('fen', help='Poziția, în notație FEN')
+    probe.add_argument('--reserve-w', default='', help='Rezervele albului, ex. "q"')
+    probe.add_argument('--reserve-b', default='', help='Rezervele negrului')
+    probe.add_argument('--dir', default=DEFAULT_DIR, help='Directorul tabelelor')
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        generate_all(args.dir, progress=lambda message: print(message, file=sys.stderr))
+        return
+
+    game_state = {
+        'board': chess.Board(args.fen),
+        'hostages': {'w': [], 'b': []},
+        'reserves': {
+            'w': [{'type': piece, 'color': 'w'} for piece in args.reserve_w],
+            'b': [{'type': piece, 'color': 'b'} for piece in args.reserve_b]
+        }
+    }
+    found = EndgameTables(args.dir).probe(game_state)
+    if found is None:
+        print('Poziția nu e acoperită de tabele')
+    elif found[0] == 0:
+        print('Remiză')
+    else:
+        print(f"{'Câștig' if found[0] > 0 else 'Pierdere'} în {found[1]} semimutări")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Starea motorului păstrată între mutările aceluiași joc.
+
+Între două căutări ale AI-ului într-un joc se joacă doar mutarea adversarului,
+deci o bună parte din arborele căutat anterior e încă relevant. Sesiunea ține:
+    - tabela de transpoziții, cu generația căutării care a scris fiecare intrare;
+    - mutările killer (tăieturi fără captură), pe ply-ul de la rădăcină;
+    - tabela history (scorul mutărilor fără captură care au produs tăieturi);
+    - varianta principală așteptată, ca pozițiile ei să înceapă cu mutarea prevăzută.
+
+Îmbătrânirea se face la începutul fiecărei căutări: intrările mai vechi de
+MAX_AGE generații sunt eliminate, tabela e redusă la jumătate din limită păstrând
+intrările recente și adânci, scorurile history sunt înjumătățite, iar killerii
+sunt mutați cu două ply-uri mai aproape de rădăcină (rădăcina a avansat o mutare
+a fiecărei părți). În timpul căutării tabela nu crește peste max_entries.
+
+Sesiunea e ținută în starea jocului ('engine_session'), deci dispare odată cu
+jocul: la ștergere, la compactarea jocurilor inactive și la terminarea partidei.
+Peste limita per joc, un SessionBudget comun limitează intrările tuturor
+sesiunilor procesului: după fiecare căutare, sesiunile folosite cel mai demult
+sunt golite până când totalul intră în buget.
+"""
+import heapq
+import threading
+import weakref
+from collections import OrderedDict
+
+# Numărul maxim de intrări în tabela de transpoziții a unui joc (~350 B per intrare, deci ~1.7 MB)
+DEFAULT_MAX_ENTRIES = 5000
+# Numărul maxim de intrări pentru toate sesiunile unui proces (~35 MB)
+DEFAULT_BUDGET_ENTRIES = 100000
+# După câte căutări fără să fie rescrisă e eliminată o intrare
+MAX_AGE = 4
+# Limita scorurilor history, ca bonusul de ordonare să rămână mărginit
+HISTORY_CAP = 4096
+
+
+class EngineSession:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, budget=None):
+        """
+        Args:
+            max_entries (int): Numărul maxim de intrări în tabela de transpoziții.
+            budget (SessionBudget, opțional): Bugetul comun al sesiunilor procesului.
+        """
+        self.max_entries = max_entries
+        self.budget = budget
+        self.table = {}  # cheia poziției -> (adâncime, valoare, tip, mutare, generație)
+        self.killers = {}  # ply de la rădăcină -> cel mult două mutări
+        self.history = {}  # mutare -> scor
+        self.expected = {}  # cheia poziției -> mutarea din varianta principală
+        self.generation = 0
+        # O singură căutare pe sesiune; o căutare concurentă pe același joc rulează fără sesiune
+        self.lock = threading.Lock()
+
+        # Metrici
+        self.searches = 0
+        self.pv_hits = 0  # Căutări a căror rădăcină era în varianta principală așteptată
+
+    def begin_search(self):
+        """Trece la o generație nouă și îmbătrânește starea căutărilor anterioare."""
+        self.generation += 1
+        self.searches += 1
+
+        oldest = self.generation - MAX_AGE
+        stale = [key for key, entry in self.table.items() if entry[4] < oldest]
+        for key in stale:
+            del self.table[key]
+        self.trim(self.max_entries // 2)
+
+        self.killers = {ply - 2: moves for ply, moves in self.killers.items() if ply >= 2}
+        self.history = {move: score >> 1 for move, score in self.history.items() if score > 1}
+
+    def end_search(self):
+        """Apelată la sfârșitul căutării, cât sesiunea e încă blocată; aplică bugetul comun."""
+        if self.budget is not None:
+            self.budget.touch(self)
+
+    def clear(self):
+        """Golește toată starea păstrată (ex. la evacuarea din bugetul comun)."""
+        self.table = {}
+        self.killers = {}
+        self.history = {}
+        self.expected = {}
+
+    def trim(self, limit):
+        """Păstrează cel mult `limit` intrări, preferând generațiile recente și adâncimile mari."""
+        if len(self.table) <= limit:
+            return
+        kept = heapq.nlargest(limit, self.table.items(), key=lambda item: (item[1][4], item[1][0]))
+        self.table = dict(kept)
+
+    def expected_move(self, key):
+        """Mutarea prevăzută de varianta principală anterioară pentru poziția dată."""
+        move = self.expected.get(key)
+        if move is not None:
+            self.pv_hits += 1
+        return move
+
+    def set_principal_variation(self, keys, moves):
+        """Reține varianta principală: perechi (cheia poziției, mutarea jucată din ea)."""
+        self.expected = dict(zip(keys, moves))
+
+    def add_killer(self, ply, move):
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+    def add_history(self, move, depth):
+        self.history[move] = min(self.history.get(move, 0) + depth * depth, HISTORY_CAP)
+
+    def stats(self):
+        return {
+            'entries': len(self.table),
+            'generation': self.generation,
+            'searches': self.searches,
+            'pv_hits': self.pv_hits
+        }
+
+
+class SessionBudget:
+    """
+    Limita comună de intrări pentru sesiunile unui proces, cu evacuare LRU.
+    Sesiunile sunt ținute prin referințe slabe, deci un joc șters sau compactat
+    iese din buget odată cu sesiunea lui.
+    """
+
+    def __init__(self, max_entries=DEFAULT_BUDGET_ENTRIES):
+        """
+        Args:
+            max_entries (int): Numărul maxim de intrări în toate sesiunile.
+        """
+        self.max_entries = max_entries
+        self.sessions = OrderedDict()  # id(sesiune) -> referință slabă, de la cea folosită cel mai demult
+        # Reentrant: callback-ul unei referințe slabe poate rula în timpul lui touch, pe același fir
+        self.lock = threading.RLock()
+        self.evictions = 0
+
+    def touch(self, session):
+        """
+        Marchează sesiunea ca folosită cel mai recent și, dacă totalul depășește
+        bugetul, golește sesiunile folosite cel mai demult. Sesiunile aflate în
+        căutare (lock ocupat) sunt sărite.
+        """
+        key = id(session)
+        with self.lock:
+            if key not in self.sessions:
+                self.sessions[key] = weakref.ref(session, lambda _, key=key: self._forget(key))
+            self.sessions.move_to_end(key)
+
+            sessions = [ref() for ref in self.sessions.values()]
+            total = sum(len(other.table) for other in sessions if other is not None)
+            for other in sessions:
+                if total <= self.max_entries:
+                    break
+                if other is None or other is session or not other.table:
+                    continue
+                if other.lock.acquire(blocking=False):
+                    try:
+                        total -= len(other.table)
+                        other.clear()
+                        self.evictions += 1
+                    finally:
+                        other.lock.release()
+
+    def _forget(self, key):
+        with self.lock:
+            self.sessions.pop(key, None)
+
+    def metrics(self):
+        with self.lock:
+            sessions = [ref() for ref in self.sessions.values()]
+            return {
+                'sessions': sum(1 for session in sessions if session is not None),
+                'entries': sum(len(session.table) for session in sessions if session is not None),
+                'max_entries': self.max_entries,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,360 @@
+"""
+Arhivarea jocurilor de Hostage Chess: export/import în format PGN extins și binar.
+
+Formatul PGN extins:
+  - capturile care devin ostatici sunt adnotate cu {[%hostage p]} după mutare;
+  - schimburile și plasările consumă rândul, deci sunt scrise ca mutare nulă (--)
+    urmată de {[%exchange q n]} (piesa dată, piesa primită) sau {[%drop N e3]}.
+
+Fișierele NU sunt compatibile cu parserele PGN standard. Un parser care ignoră
+adnotările ar interpreta greșit jocul: după "5. -- {[%drop P d3]}", mutarea "6. d4"
+ar fi citită ca d2-d4. De aceea fiecare joc are antetul [Variant "Hostage"],
+pe care parserele standard îl raportează ca eroare (python-chess îl trece în
+game.errors ca "unsupported variant"); jocurile se citesc doar cu read_pgn.
+
+Cititoarele și scriitoarele sunt generatoare care procesează câte un joc pe rând,
+deci fișierele de orice dimensiune sunt parcurse cu memorie constantă.
+Varianta binară codifică fiecare eveniment în 3 octeți, pentru reîncărcare rapidă.
+"""
+import json
+import re
+import struct
+import sys
+
+import chess
+
+from game_history import GameHistory
+from hostage_rules import is_checkmate, is_game_over
+
+BINARY_MAGIC = b'HCB1'
+
+EVENT_MOVE = 0
+EVENT_DROP = 1
+EVENT_EXCHANGE = 2
+
+_HEADER_RE = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+_TOKEN_RE = re.compile(r'\{[^}]*\}|;[^\n]*|\d+\.(?:\.\.)?|1-0|0-1|1/2-1/2|\*|--|[^\s{};]+')
+_COMMAND_RE = re.compile(r'\[%(\w+)\s+([^\]]*)\]')
+
+
+def new_game_state():
+    """Stare minimă de joc pe care se pot reaplica evenimentele din arhivă."""
+    return {
+        'board': chess.Board(),
+        'hostages': {'w': [], 'b': []},
+        'reserves': {'w': [], 'b': []},
+        'move_count': 0,
+        'last_move': None,
+        'history': GameHistory()
+    }
+
+
+def game_record(game_state, headers=None):
+    """
+    Construiește înregistrarea de arhivă a unui joc.
+
+    Returns:
+        dict: {'headers': {...}, 'events': [...]} cu evenimentele din istoric.
+    """
+    record_headers = {
+        'Event': 'Hostage Chess',
+        'Variant': 'Hostage',
+        'Result': _result(game_state)
+    }
+    record_headers.update(headers or {})
+    # Varianta nu poate fi suprascrisă: fără ea, un parser standard ar citi jocul greșit
+    record_headers['Variant'] = 'Hostage'
+    history = game_state['history']
+    return {'headers': record_headers, 'events': history.to_list()[:history.cursor]}
+
+
+def replay_events(events, game_state=None):
+    """
+    Reaplică evenimentele unei înregistrări pe o stare de joc nouă.
+
+    Returns:
+        dict: Starea jocului după toate evenimentele.
+    """
+    game_state = game_state or new_game_state()
+    history = game_state['history']
+    for event in events:
+        if event['kind'] == 'move':
+            history.push_move(game_state, chess.Move.from_uci(event['move']))
+        elif event['kind'] == 'drop':
+            history.push_drop(game_state, event['color'], event['reserve_idx'], event['square'])
+        elif event['kind'] == 'exchange':
+            history.push_exchange(game_state, event['color'], event['given_idx'], event['received_idx'])
+    return game_state
+
+
+# ---------------------------------------------------------------------------
+# PGN
+# ---------------------------------------------------------------------------
+
+def iter_pgn(records):
+    """Generator: produce textul PGN pentru fiecare înregistrare, pe rând."""
+    for record in records:
+        yield record_to_pgn(record) + '\n\n'
+
+
+def write_pgn(records, fp):
+    """Scrie înregistrările în fp; returnează numărul de jocuri scrise."""
+    count = 0
+    for chunk in iter_pgn(records):
+        fp.write(chunk)
+        count += 1
+    return count
+
+
+def record_to_pgn(record):
+    """Convertește o înregistrare într-un singur joc PGN (cu antetul Variant impus)."""
+    headers = dict(record['headers'], Variant='Hostage')
+    lines = [f'[{key} "{_escape(str(value))}"]' for key, value in headers.items()]
+
+    game_state = new_game_state()
+    board = game_state['board']
+    history = game_state['history']
+    tokens = []
+
+    for event in record['events']:
+        if board.turn == chess.WHITE:
+            tokens.append(f'{board.fullmove_number}.')
+        elif not tokens:
+            tokens.append(f'{board.fullmove_number}...')
+
+        if event['kind'] == 'move':
+            move = chess.Move.from_uci(event['move'])
+            tokens.append(board.san(move))
+            hostage = history.push_move(game_state, move)
+            if hostage:
+                tokens.append(f"{{[%hostage {hostage['type']}]}}")
+        elif event['kind'] == 'drop':
+            piece = game_state['reserves'][event['color']][event['reserve_idx']]
+            tokens.append('--')
+            tokens.append(f"{{[%drop {piece['type'].upper()} {event['square']}]}}")
+            history.push_drop(game_state, event['color'], event['reserve_idx'], event['square'])
+        elif event['kind'] == 'exchange':
+            opponent = 'b' if event['color'] == 'w' else 'w'
+            given = game_state['hostages'][event['color']][event['given_idx']]
+            received = game_state['hostages'][opponent][event['received_idx']]
+            tokens.append('--')
+            tokens.append(f"{{[%exchange {given['type']} {received['type']}]}}")
+            history.push_exchange(game_state, event['color'], event['given_idx'], event['received_idx'])
+
+    tokens.append(headers.get('Result', '*'))
+    return '\n'.join(lines) + '\n\n' + _wrap(tokens)
+
+
+def read_pgn(fp):
+    """
+    Generator: citește jocurile dintr-un fișier PGN extins, unul câte unul.
+
+    Yields:
+        dict: {'headers': {...}, 'events': [...]} pentru fiecare joc.
+    """
+    headers = {}
+    movetext = []
+    for line in fp:
+        stripped = line.strip()
+        if stripped.startswith('['):
+            if movetext:
+                yield pgn_to_record(headers, ' '.join(movetext))
+                headers, movetext = {}, []
+            match = _HEADER_RE.match(stripped)
+            if match:
+                headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+        elif stripped and not stripped.startswith('%'):
+            movetext.append(stripped)
+    if headers or movetext:
+        yield pgn_to_record(headers, ' '.join(movetext))
+
+
+def pgn_to_record(headers, movetext):
+    """Interpretează textul mutărilor unui joc și reconstruiește evenimentele."""
+    game_state = new_game_state()
+    board = game_state['board']
+    history = game_state['history']
+    pending_null = False
+
+    for token in _TOKEN_RE.findall(movetext):
+        if token.startswith('{'):
+            for command, args in _COMMAND_RE.findall(token):
+                args = args.split()
+                color = 'w' if board.turn == chess.WHITE else 'b'
+                if command == 'drop' and pending_null:
+                    reserve_idx = _find_piece(game_state['reserves'][color], args[0])
+                    history.push_drop(game_state, color, reserve_idx, args[1])
+                    pending_null = False
+                elif command == 'exchange' and pending_null:
+                    opponent = 'b' if color == 'w' else 'w'
+                    given_idx = _find_piece(game_state['hostages'][color], args[0])
+                    received_idx = _find_piece(game_state['hostages'][opponent], args[1])
+                    history.push_exchange(game_state, color, given_idx, received_idx)
+                    pending_null = False
+        elif token.startswith(';') or token[0].isdigit() and token.endswith('.'):
+            continue
+        elif token in ('1-0', '0-1', '1/2-1/2', '*'):
+            break
+        elif token == '--':
+            if pending_null:
+                raise ValueError('Mutare nulă fără adnotare de schimb sau plasare')
+            pending_null = True
+        else:
+            if pending_null:
+                raise ValueError('Mutare nulă fără adnotare de schimb sau plasare')
+            history.push_move(game_state, board.parse_san(token.rstrip('!?')))
+
+    if pending_null:
+        raise ValueError('Mutare nulă fără adnotare de schimb sau plasare')
+    return {'headers': headers, 'events': history.to_list()}
+
+
+# ---------------------------------------------------------------------------
+# Format binar
+# ---------------------------------------------------------------------------
+
+def write_binary(records, fp):
+    """Scrie înregistrările în format binar compact; returnează numărul de jocuri."""
+    fp.write(BINARY_MAGIC)
+    count = 0
+    for record in records:
+        fp.write(record_to_bytes(record))
+        count += 1
+    return count
+
+
+def read_binary(fp):
+    """Generator: citește înregistrările dintr-un fișier binar, una câte una."""
+    if fp.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError('Fișierul nu este o arhivă binară Hostage Chess')
+    while True:
+        header_len = _read_varint(fp)
+        if header_len is None:
+            return
+        headers = json.loads(fp.read(header_len).decode('utf-8'))
+        event_count = _read_varint(fp)
+        data = fp.read(event_count * 3) if event_count is not None else b''
+        if event_count is None or len(data) != event_count * 3:
+            raise ValueError('Arhivă binară trunchiată')
+        events = [_decode_event(data[offset:offset + 3]) for offset in range(0, len(data), 3)]
+        _fill_colors(events)
+        yield {'headers': headers, 'events': events}
+
+
+def record_to_bytes(record):
+    """Codifică o înregistrare: antete JSON, numărul de evenimente, 3 octeți/eveniment."""
+    header_bytes = json.dumps(record['headers'], separators=(',', ':')).encode('utf-8')
+    out = bytearray(_varint(len(header_bytes)))
+    out += header_bytes
+    out += _varint(len(record['events']))
+    for event in record['events']:
+        out += _encode_event(event)
+    return bytes(out)
+
+
+def _encode_event(event):
+    if event['kind'] == 'move':
+        move = chess.Move.from_uci(event['move'])
+        packed = move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+        return struct.pack('<BH', EVENT_MOVE, packed)
+    if event['kind'] == 'drop':
+        return struct.pack('<BBB', EVENT_DROP, event['reserve_idx'], chess.parse_square(event['square']))
+    return struct.pack('<BBB', EVENT_EXCHANGE, event['given_idx'], event['received_idx'])
+
+
+def _decode_event(data):
+    kind = data[0]
+    if kind == EVENT_MOVE:
+        packed = struct.unpack('<H', data[1:3])[0]
+        move = chess.Move(packed & 63, (packed >> 6) & 63, (packed >> 12) or None)
+        return {'kind': 'move', 'move': move.uci()}
+    if kind == EVENT_DROP:
+        return {'kind': 'drop', 'reserve_idx': data[1], 'square': chess.square_name(data[2])}
+    return {'kind': 'exchange', 'given_idx': data[1], 'received_idx': data[2]}
+
+
+def _fill_colors(events):
+    # Culoarea nu e stocată: fiecare eveniment consumă exact un rând, alternând de la alb
+    color = 'w'
+    for event in events:
+        event['color'] = color
+        color = 'b' if color == 'w' else 'w'
+
+
+def _varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _read_varint(fp):
+    value = 0
+    shift = 0
+    while True:
+        byte = fp.read(1)
+        if not byte:
+            if shift:
+                raise ValueError('Arhivă binară trunchiată')
+            return None
+        value |= (byte[0] & 0x7F) << shift
+        if not byte[0] & 0x80:
+            return value
+        shift += 7
+
+
+# ---------------------------------------------------------------------------
+# Utilitare
+# ---------------------------------------------------------------------------
+
+def _result(game_state):
+    # Matul și patul țin cont de plasări și schimburi, ca în restul regulilor
+    if is_checkmate(game_state):
+        return '0-1' if game_state['board'].turn == chess.WHITE else '1-0'
+    return '1/2-1/2' if is_game_over(game_state) else '*'
+
+
+def _find_piece(pieces, piece_type):
+    for idx, piece in enumerate(pieces):
+        if piece['type'].lower() == piece_type.lower():
+            return idx
+    raise ValueError(f'Piesa {piece_type} nu există în listă')
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _wrap(tokens, width=79):
+    lines = []
+    line = ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > width:
+            lines.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    if line:
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def convert(source_path, target_path):
+    """Convertește o arhivă între PGN și binar, după extensia fișierelor."""
+    source_binary = not source_path.endswith('.pgn')
+    target_binary = not target_path.endswith('.pgn')
+    with open(source_path, 'rb' if source_binary else 'r', encoding=None if source_binary else 'utf-8') as source:
+        records = read_binary(source) if source_binary else read_pgn(source)
+        with open(target_path, 'wb' if target_binary else 'w', encoding=None if target_binary else 'utf-8') as target:
+            if target_binary:
+                return write_binary(records, target)
+            return write_pgn(records, target)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Utilizare: python game_archive.py <sursă.pgn|.hcb> <destinație.pgn|.hcb>')
+        sys.exit(1)
+    print(f'{convert(sys.argv[1], sys.argv[2])} jocuri convertite')
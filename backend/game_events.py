@@ -0,0 +1,176 @@
+"""
+Canal push de evenimente pentru Hostage Chess (Server-Sent Events).
+Fiecare joc are un jurnal de evenimente numerotate secvențial (mutări, ostatici,
+rezerve, progresul AI-ului, sfârșitul jocului). Un client se abonează o singură dată
+și primește evenimentele pe măsură ce apar; la reconectare poate relua fluxul
+de la ultimul număr de secvență primit.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+
+class GameEventChannel:
+    def __init__(self, max_events=256, first_seq=1):
+        """
+        Inițializează canalul de evenimente al unui joc.
+
+        Args:
+            max_events (int): Numărul maxim de evenimente păstrate pentru reluare.
+            first_seq (int): Numărul de secvență al primului eveniment.
+        """
+        self.events = deque(maxlen=max_events)
+        self.first_seq = first_seq
+        self.next_seq = first_seq
+        self.closed = False
+        self.listeners = 0  # Fluxurile deschise pe canal
+        self.condition = threading.Condition()
+
+    def publish(self, event_type, data):
+        """
+        Adaugă un eveniment nou și trezește clienții abonați. Datele sunt
+        serializate imediat, ca modificările ulterioare ale stării jocului
+        (ex. undo) să nu rescrie evenimentele deja publicate.
+        """
+        with self.condition:
+            event = {'seq': self.next_seq, 'type': event_type, 'data': json.dumps(data)}
+            self.next_seq += 1
+            self.events.append(event)
+            self.condition.notify_all()
+            return event
+
+    def close(self):
+        """Marchează canalul ca închis (jocul s-a terminat)."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def reopen(self):
+        """Redeschide canalul (ex. după undo dintr-o poziție finală)."""
+        with self.condition:
+            self.closed = False
+
+    def events_after(self, seq):
+        """
+        Returnează evenimentele cu numărul de secvență mai mare decât seq.
+
+        Returns:
+            tuple: (lista de evenimente, True dacă unele evenimente s-au pierdut din jurnal)
+        """
+        with self.condition:
+            return self._events_after(seq)
+
+    def wait_for_events(self, seq, timeout):
+        """Așteaptă (cel mult timeout secunde) evenimente noi după seq."""
+        with self.condition:
+            if self.next_seq - 1 <= seq and not self.closed:
+                self.condition.wait(timeout)
+            return self._events_after(seq)
+
+    def _events_after(self, seq):
+        # seq = 0 cere canalul de la început; un seq mai mic decât începutul canalului
+        # vine de la un canal anterior al jocului, ale cărui evenimente s-au pierdut
+        if seq == 0:
+            seq = self.first_seq - 1
+        missed = seq < self.first_seq - 1 or (bool(self.events) and self.events[0]['seq'] > seq + 1)
+        return [event for event in self.events if event['seq'] > seq], missed
+
+
+class GameEventBus:
+    def __init__(self, max_events=256, keepalive_interval=15):
+        """
+        Inițializează registrul de canale, câte unul pentru fiecare game_id.
+
+        Args:
+            max_events (int): Câte evenimente păstrează fiecare canal.
+            keepalive_interval (float): La câte secunde se trimite un comentariu keep-alive.
+        """
+        self.max_events = max_events
+        self.keepalive_interval = keepalive_interval
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    def channel(self, game_id):
+        """
+        Returnează canalul jocului, creându-l dacă nu există. Numerotarea unui canal
+        nou pornește de la timpul curent în microsecunde, deci peste orice număr al
+        unui canal eliminat anterior pentru același joc; clienții care reiau fluxul
+        cu un număr vechi primesc un 'snapshot'.
+        """
+        with self.lock:
+            if game_id not in self.channels:
+                self.channels[game_id] = GameEventChannel(self.max_events, time.time_ns() // 1000)
+            return self.channels[game_id]
+
+    def has_listeners(self, game_id):
+        """True dacă jocul are cel puțin un flux deschis."""
+        with self.lock:
+            channel = self.channels.get(game_id)
+        return channel is not None and channel.listeners > 0
+
+    def publish(self, game_id, event_type, data):
+        return self.channel(game_id).publish(event_type, data)
+
+    def close(self, game_id):
+        self.channel(game_id).close()
+
+    def reopen(self, game_id):
+        self.channel(game_id).reopen()
+
+    def remove(self, game_id):
+        """Închide și elimină canalul unui joc."""
+        with self.lock:
+            channel = self.channels.pop(game_id, None)
+        if channel:
+            channel.close()
+
+    def stream(self, game_id, last_seq=0, snapshot=None):
+        """
+        Generator de text Server-Sent Events pentru un joc.
+
+        Args:
+            game_id (str): Jocul urmărit.
+            last_seq (int): Ultimul număr de secvență primit de client (0 = de la început).
+            snapshot (callable, opțional): Întoarce starea completă a jocului; este trimisă
+                ca eveniment 'snapshot' când evenimentele cerute nu mai sunt în jurnal.
+        """
+        channel = self.channel(game_id)
+        with channel.condition:
+            channel.listeners += 1
+        try:
+            events, missed = channel.events_after(last_seq)
+            last_seq = max(last_seq, channel.first_seq - 1)
+
+            if missed and snapshot is not None:
+                yield format_sse('snapshot', json.dumps(snapshot()))
+
+            while True:
+                for event in events:
+                    last_seq = event['seq']
+                    yield format_sse(event['type'], event['data'], event['seq'])
+
+                if channel.closed:
+                    remaining, _ = channel.events_after(last_seq)
+                    if not remaining:
+                        return
+                    events = remaining
+                    continue
+
+                events, _ = channel.wait_for_events(last_seq, self.keepalive_interval)
+                if not events and not channel.closed:
+                    # Comentariu SSE care ține conexiunea deschisă prin proxy-uri
+                    yield ': keep-alive\n\n'
+        finally:
+            with channel.condition:
+                channel.listeners -= 1
+
+
+def format_sse(event_type, payload, seq=None):
+    """Formatează un eveniment (cu datele deja serializate JSON) în formatul text/event-stream."""
+    lines = []
+    if seq is not None:
+        lines.append(f'id: {seq}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {payload}')
+    return '\n'.join(lines) + '\n\n'
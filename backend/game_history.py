@@ -0,0 +1,216 @@
+"""
+Istoricul unui joc de Hostage Chess: jurnal de evenimente cu undo/redo.
+Fiecare eveniment (mutare, plasare din rezerve, schimb de ostatici) este o deltă
+reversibilă, așa că undo și redo costă O(1) fără copii ale întregii stări.
+Din când în când se salvează un checkpoint, din care orice poziție trecută
+poate fi reconstruită rapid.
+"""
+import chess
+from copy import deepcopy
+
+
+class GameHistory:
+    def __init__(self, checkpoint_interval=16, start_fen=chess.STARTING_FEN):
+        """
+        Inițializează un istoric gol.
+
+        Args:
+            checkpoint_interval (int): La câte evenimente se salvează un checkpoint.
+            start_fen (str): Poziția de start a jocului.
+        """
+        self.events = []
+        self.cursor = 0  # Numărul de evenimente aplicate pe starea curentă
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = {0: {
+            'fen': start_fen,
+            'hostages': {'w': [], 'b': []},
+            'reserves': {'w': [], 'b': []},
+            'move_count': 0,
+            'last_move': None
+        }}
+
+    def push_move(self, game_state, move):
+        """
+        Execută o mutare pe tablă și o adaugă în istoric.
+
+        Returns:
+            dict: Ostaticul capturat sau None.
+        """
+        board = game_state['board']
+        if board.is_en_passant(move):
+            captured_piece = chess.Piece(chess.PAWN, not board.turn)
+        else:
+            captured_piece = board.piece_at(move.to_square)
+
+        hostage = None
+        if captured_piece and captured_piece.piece_type != chess.KING:
+            hostage = {
+                'type': chess.piece_symbol(captured_piece.piece_type),
+                'color': 'w' if captured_piece.color == chess.WHITE else 'b'
+            }
+
+        event = {
+            'kind': 'move',
+            'move': move.uci(),
+            'color': 'w' if board.turn else 'b',
+            'hostage': hostage,
+            'previous_last_move': game_state.get('last_move')
+        }
+        self._push(game_state, event)
+        return hostage
+
+    def push_drop(self, game_state, color, reserve_idx, square):
+        """Plasează pe tablă piesa reserve_idx din rezervele culorii color."""
+        event = {
+            'kind': 'drop',
+            'color': color,
+            'reserve_idx': reserve_idx,
+            'piece': game_state['reserves'][color][reserve_idx],
+            'square': square,
+            'previous_last_move': game_state.get('last_move')
+        }
+        self._push(game_state, event)
+
+    def push_exchange(self, game_state, color, given_idx, received_idx):
+        """
+        Schimbă ostaticul given_idx al culorii color pe ostaticul received_idx
+        al adversarului; piesa primită intră în rezervele culorii color.
+        """
+        opponent = 'b' if color == 'w' else 'w'
+        event = {
+            'kind': 'exchange',
+            'color': color,
+            'given_idx': given_idx,
+            'given': game_state['hostages'][color][given_idx],
+            'received_idx': received_idx,
+            'received': game_state['hostages'][opponent][received_idx],
+            'previous_last_move': game_state.get('last_move')
+        }
+        self._push(game_state, event)
+
+    def can_undo(self):
+        return self.cursor > 0
+
+    def can_redo(self):
+        return self.cursor < len(self.events)
+
+    def undo(self, game_state):
+        """Anulează ultimul eveniment aplicat. Returnează evenimentul sau None."""
+        if not self.can_undo():
+            return None
+        self.cursor -= 1
+        event = self.events[self.cursor]
+        _revert_event(game_state, event)
+        return event
+
+    def redo(self, game_state):
+        """Reaplică ultimul eveniment anulat. Returnează evenimentul sau None."""
+        if not self.can_redo():
+            return None
+        event = self.events[self.cursor]
+        _apply_event(game_state, event)
+        self.cursor += 1
+        return event
+
+    def state_at(self, ply):
+        """
+        Reconstruiește starea jocului după primele `ply` evenimente,
+        pornind de la cel mai apropiat checkpoint anterior.
+        """
+        if ply < 0 or ply > len(self.events):
+            raise ValueError(f'Ply în afara istoricului: {ply}')
+
+        start = max(index for index in self.checkpoints if index <= ply)
+        checkpoint = self.checkpoints[start]
+        game_state = {
+            'board': chess.Board(checkpoint['fen']),
+            'hostages': deepcopy(checkpoint['hostages']),
+            'reserves': deepcopy(checkpoint['reserves']),
+            'move_count': checkpoint['move_count'],
+            'last_move': checkpoint['last_move']
+        }
+        for event in self.events[start:ply]:
+            _apply_event(game_state, event)
+        return game_state
+
+    def to_list(self):
+        """Evenimentele istoricului într-o formă serializabilă JSON."""
+        return [
+            {key: value for key, value in event.items() if key != 'previous_last_move'}
+            for event in self.events
+        ]
+
+    def _push(self, game_state, event):
+        # O acțiune nouă după undo invalidează ramura de redo
+        if self.cursor < len(self.events):
+            del self.events[self.cursor:]
+            for index in [index for index in self.checkpoints if index > self.cursor]:
+                del self.checkpoints[index]
+
+        _apply_event(game_state, event)
+        self.events.append(event)
+        self.cursor += 1
+
+        if self.cursor % self.checkpoint_interval == 0:
+            self.checkpoints[self.cursor] = {
+                'fen': game_state['board'].fen(),
+                'hostages': deepcopy(game_state['hostages']),
+                'reserves': deepcopy(game_state['reserves']),
+                'move_count': game_state.get('move_count', 0),
+                'last_move': game_state.get('last_move')
+            }
+
+
+def _apply_event(game_state, event):
+    """Aplică delta unui eveniment pe starea jocului."""
+    board = game_state['board']
+    color = event['color']
+    opponent = 'b' if color == 'w' else 'w'
+
+    if event['kind'] == 'move':
+        board.push(chess.Move.from_uci(event['move']))
+        if event['hostage']:
+            game_state['hostages'][color].append(dict(event['hostage']))
+        game_state['move_count'] = game_state.get('move_count', 0) + 1
+        game_state['last_move'] = event['move']
+
+    elif event['kind'] == 'drop':
+        piece = game_state['reserves'][color].pop(event['reserve_idx'])
+        # BaseBoard.set_piece_at nu golește stiva de mutări (Board.set_piece_at ar face-o)
+        chess.BaseBoard.set_piece_at(
+            board,
+            chess.parse_square(event['square']),
+            chess.Piece.from_symbol(piece['type'].upper() if color == 'w' else piece['type'].lower())
+        )
+        # Plasarea consumă rândul jucătorului
+        board.push(chess.Move.null())
+
+    elif event['kind'] == 'exchange':
+        game_state['hostages'][color].pop(event['given_idx'])
+        received = game_state['hostages'][opponent].pop(event['received_idx'])
+        game_state['reserves'][color].append({'type': received['type'], 'color': color})
+        board.push(chess.Move.null())
+
+
+def _revert_event(game_state, event):
+    """Anulează delta unui eveniment; inversul exact al lui _apply_event."""
+    board = game_state['board']
+    color = event['color']
+    opponent = 'b' if color == 'w' else 'w'
+
+    board.pop()
+    if event['kind'] == 'move':
+        if event['hostage']:
+            game_state['hostages'][color].pop()
+        game_state['move_count'] = game_state.get('move_count', 0) - 1
+
+    elif event['kind'] == 'drop':
+        chess.BaseBoard.remove_piece_at(board, chess.parse_square(event['square']))
+        game_state['reserves'][color].insert(event['reserve_idx'], event['piece'])
+
+    elif event['kind'] == 'exchange':
+        game_state['reserves'][color].pop()
+        game_state['hostages'][opponent].insert(event['received_idx'], event['received'])
+        game_state['hostages'][color].insert(event['given_idx'], event['given'])
+
+    game_state['last_move'] = event['previous_last_move']
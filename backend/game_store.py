@@ -0,0 +1,386 @@
+"""
+Stocarea jocurilor în memorie, cu compactarea jocurilor inactive.
+
+Un joc activ ține o tablă python-chess cu toată stiva de mutări, istoricul cu
+evenimente și checkpoint-uri și cache-urile de stare, adică zeci de KB după o
+partidă obișnuită. Jocurile fără nicio cerere în ultimele idle_seconds sunt
+compactate pe loc într-un instantaneu binar de câteva sute de octeți și
+reconstruite la următorul acces, prin reaplicarea evenimentelor din istoric.
+
+Formatul instantaneului:
+    octet: versiunea formatului
+    octet: starea (bitul 0 = terminat) și faza rândului (biții 1-2)
+    varint: versiunea jocului, apoi versiunile câmpurilor fen, hostages, reserves
+    varint: numărul de evenimente, apoi cursorul istoricului (evenimentele de
+        după cursor pot fi refăcute cu redo)
+    câte un varint per eveniment, cu tipul în ultimii doi biți:
+        mutare:  (from | to << 6 | promovare << 12) << 2
+        plasare: (index în rezerve << 6 | pătrat) << 2 | 1
+        schimb:  (index dat << 8 | index primit) << 2 | 2
+Culoarea evenimentelor nu e stocată: fiecare consumă exact un rând, alternând de la alb.
+
+Exemplu (benchmark):
+    python game_store.py --games 2000 --plies 80
+"""
+import argparse
+import random
+import threading
+import time
+import tracemalloc
+
+import chess
+
+import game_archive
+
+SNAPSHOT_VERSION = 1
+
+EVENT_MOVE = 0
+EVENT_DROP = 1
+EVENT_EXCHANGE = 2
+
+TURN_PHASES = ('normal', 'exchange', 'drop')
+
+
+def compact_game(game_state):
+    """Codifică starea jocului într-un instantaneu binar (vezi antetul modulului)."""
+    history = game_state['history']
+    field_versions = game_state.get('field_versions', {})
+    flags = (1 if game_state.get('game_status') == 'finished' else 0)
+    flags |= TURN_PHASES.index(game_state.get('turn_phase', 'normal')) << 1
+
+    out = bytearray((SNAPSHOT_VERSION, flags))
+    for value in (game_state.get('version', 0), field_versions.get('fen', 0),
+                  field_versions.get('hostages', 0), field_versions.get('reserves', 0),
+                  len(history.events), history.cursor):
+        out += _varint(value)
+    for event in history.events:
+        out += _varint(_encode_event(event))
+    return bytes(out)
+
+
+def revive_game(data, new_game):
+    """
+    Reconstruiește starea completă a jocului dintr-un instantaneu.
+
+    Args:
+        data (bytes): Rezultatul lui compact_game.
+        new_game (callable): Creează o stare de joc nouă (create_new_game din app).
+    """
+    if data[0] != SNAPSHOT_VERSION:
+        raise ValueError(f'Versiune necunoscută a instantaneului: {data[0]}')
+    flags = data[1]
+    offset = 2
+    values = []
+    for _ in range(6):
+        value, offset = _read_varint(data, offset)
+        values.append(value)
+    version, fen_version, hostages_version, reserves_version, event_count, cursor = values
+
+    events = []
+    color = 'w'
+    for _ in range(event_count):
+        value, offset = _read_varint(data, offset)
+        event = _decode_event(value)
+        event['color'] = color
+        events.append(event)
+        color = 'b' if color == 'w' else 'w'
+
+    # Evenimentele de după cursor sunt reaplicate și anulate, ca redo să rămână posibil
+    game_state = game_archive.replay_events(events, new_game())
+    history = game_state['history']
+    while history.cursor > cursor:
+        history.undo(game_state)
+
+    game_state['game_status'] = 'finished' if flags & 1 else 'active'
+    game_state['turn_phase'] = TURN_PHASES[(flags >> 1) & 3]
+    game_state['version'] = version
+    game_state['field_versions'] = {'fen': fen_version, 'hostages': hostages_version, 'reserves': reserves_version}
+    return game_state
+
+
+class GameStore:
+    """
+    Dicționar game_id -> stare de joc care compactează jocurile inactive.
+    Accesul printr-un game_id (games[game_id], game_id in games) nu reconstruiește
+    jocul decât la citire; fiecare citire reîncepe perioada de inactivitate.
+    """
+
+    def __init__(self, new_game, idle_seconds=600.0, sweep_interval=60.0, max_per_sweep=50, on_release=None,
+                 keep_alive=None):
+        """
+        Args:
+            new_game (callable): Creează o stare de joc nouă, folosită la reconstruire.
+            idle_seconds (float): După cât timp fără cereri e compactat un joc
+                (None dezactivează compactarea).
+            sweep_interval (float): Cât de des sunt căutate jocurile inactive;
+                căutarea se face la accesări, fără fir separat.
+            max_per_sweep (int): Câte jocuri sunt compactate cel mult la o căutare.
+            on_release (callable, opțional): Apelată cu game_id după ce jocul e șters
+                sau compactat, pentru resursele ținute în afara stării (ex. canalul push).
+            keep_alive (callable, opțional): Apelată cu game_id; jocurile pentru care
+                returnează True nu sunt compactate oricât de vechi ar fi (ex. jocuri
+                urmărite prin fluxul push, care nu fac cereri).
+        """
+        self.new_game = new_game
+        self.on_release = on_release
+        self.keep_alive = keep_alive
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self.max_per_sweep = max_per_sweep
+        self.lock = threading.RLock()
+        self.live = {}
+        self.compacted = {}
+        self.last_access = {}
+        self.last_sweep = time.monotonic()
+
+        # Metrici
+        self.compactions = 0
+        self.revivals = 0
+        self.skipped = 0  # Jocuri care nu au putut fi refăcute din istoric
+        self.revive_times = []
+
+    def __contains__(self, game_id):
+        with self.lock:
+            return game_id in self.live or game_id in self.compacted
+
+    def __getitem__(self, game_id):
+        now = time.monotonic()
+        with self.lock:
+            game_state = self.live.get(game_id)
+            if game_state is None:
+                game_state = self._revive(game_id)
+            self.last_access[game_id] = now
+            sweep = self._sweep_due(now)
+        # Căutarea rulează după eliberarea lock-ului, ca reconstruirea de verificare să nu blocheze alte cereri
+        if sweep:
+            self.compact_idle(now)
+        return game_state
+
+    def __setitem__(self, game_id, game_state):
+        now = time.monotonic()
+        with self.lock:
+            self.compacted.pop(game_id, None)
+            self.live[game_id] = game_state
+            self.last_access[game_id] = now
+            sweep = self._sweep_due(now)
+        if sweep:
+            self.compact_idle(now)
+
+    def __delitem__(self, game_id):
+        with self.lock:
+            if self.live.pop(game_id, None) is None:
+                del self.compacted[game_id]
+            self.last_access.pop(game_id, None)
+        if self.on_release is not None:
+            self.on_release(game_id)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.live) + len(self.compacted)
+
+    def get(self, game_id, default=None):
+        try:
+            return self[game_id]
+        except KeyError:
+            return default
+
+    def _revive(self, game_id):
+        start = time.perf_counter()
+        game_state = revive_game(self.compacted.pop(game_id), self.new_game)
+        self.live[game_id] = game_state
+        self.revivals += 1
+        self.revive_times.append(time.perf_counter() - start)
+        del self.revive_times[:-1000]
+        return game_state
+
+    def _sweep_due(self, now):
+        """
+        Apelată sub lock: True dacă a venit timpul unei căutări de jocuri inactive.
+        last_sweep e actualizat imediat, ca o singură cerere să facă o căutare.
+        """
+        if self.idle_seconds is None or now - self.last_sweep < self.sweep_interval:
+            return False
+        self.last_sweep = now
+        return True
+
+    def compact_idle(self, now=None, limit=None):
+        """
+        Compactează jocurile fără acces în ultimele idle_seconds, cel mult `limit`
+        (implicit max_per_sweep), ca accesul care declanșează căutarea să nu
+        aștepte după toate jocurile inactive. Jocurile ținute de keep_alive sunt sărite.
+
+        Instantaneele sunt construite în afara lock-ului și verificate prin
+        reconstruire; un joc a cărui stare nu poate fi refăcută din istoric rămâne
+        activ. Un handler mai vechi decât idle_seconds care încă modifică jocul
+        i-ar pierde modificările, de aceea idle_seconds trebuie să depășească cu
+        mult durata maximă a unei cereri.
+
+        Returns:
+            int: Numărul de jocuri compactate.
+        """
+        now = time.monotonic() if now is None else now
+        limit = self.max_per_sweep if limit is None else limit
+        with self.lock:
+            self.last_sweep = now
+            if self.idle_seconds is None:
+                return 0
+            candidates = []
+            for game_id, game_state in self.live.items():
+                accessed = self.last_access.get(game_id, now)
+                if now - accessed >= self.idle_seconds and not self._kept_alive(game_id):
+                    candidates.append((game_id, game_state, accessed))
+                    if len(candidates) >= limit:
+                        break
+
+        snapshots = []
+        for game_id, game_state, accessed in candidates:
+            data = compact_game(game_state)
+            try:
+                faithful = _same_position(revive_game(data, self.new_game), game_state)
+            except (IndexError, ValueError):
+                faithful = False
+            if faithful:
+                snapshots.append((game_id, game_state, accessed, data))
+            else:
+                self.skipped += 1
+
+        released = []
+        with self.lock:
+            for game_id, game_state, accessed, data in snapshots:
+                # Jocul accesat sau urmărit între timp rămâne activ
+                if (self.live.get(game_id) is game_state and self.last_access.get(game_id) == accessed
+                        and not self._kept_alive(game_id)):
+                    del self.live[game_id]
+                    self.compacted[game_id] = data
+                    released.append(game_id)
+            self.compactions += len(released)
+        if self.on_release is not None:
+            for game_id in released:
+                self.on_release(game_id)
+        return len(released)
+
+    def _kept_alive(self, game_id):
+        return self.keep_alive is not None and self.keep_alive(game_id)
+
+    def metrics(self):
+        """Numărul de jocuri active/compactate, memoria instantaneelor și latența reconstruirii."""
+        with self.lock:
+            times = sorted(self.revive_times)
+            compact_bytes = sum(len(data) for data in self.compacted.values())
+            return {
+                'live': len(self.live),
+                'compacted': len(self.compacted),
+                'compacted_bytes': compact_bytes,
+                'compactions': self.compactions,
+                'revivals': self.revivals,
+                'skipped': self.skipped,
+                'revive_ms_avg': sum(times) / len(times) * 1000 if times else 0.0,
+                'revive_ms_p95': times[int((len(times) - 1) * 0.95)] * 1000 if times else 0.0
+            }
+
+
+def _same_position(revived, game_state):
+    return (revived['board'].fen() == game_state['board'].fen()
+            and revived['hostages'] == game_state['hostages']
+            and revived['reserves'] == game_state['reserves'])
+
+
+def _encode_event(event):
+    if event['kind'] == 'move':
+        move = chess.Move.from_uci(event['move'])
+        return (move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)) << 2 | EVENT_MOVE
+    if event['kind'] == 'drop':
+        return (event['reserve_idx'] << 6 | chess.parse_square(event['square'])) << 2 | EVENT_DROP
+    return (event['given_idx'] << 8 | event['received_idx']) << 2 | EVENT_EXCHANGE
+
+
+def _decode_event(value):
+    kind = value & 3
+    value >>= 2
+    if kind == EVENT_MOVE:
+        move = chess.Move(value & 63, (value >> 6) & 63, (value >> 12) or None)
+        return {'kind': 'move', 'move': move.uci()}
+    if kind == EVENT_DROP:
+        return {'kind': 'drop', 'reserve_idx': value >> 6, 'square': chess.square_name(value & 63)}
+    return {'kind': 'exchange', 'given_idx': value >> 8, 'received_idx': value & 255}
+
+
+def _varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _random_game(new_game, plies, rng):
+    """Un joc cu mutări aleatorii, pentru benchmark."""
+    game_state = new_game()
+    history = game_state['history']
+    for _ in range(plies):
+        moves = list(game_state['board'].legal_moves)
+        if not moves:
+            break
+        history.push_move(game_state, rng.choice(moves))
+    game_state['version'] = history.cursor
+    return game_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pentru compactarea jocurilor inactive')
+    parser.add_argument('--games', type=int, default=1000, help='Numărul de jocuri')
+    parser.add_argument('--plies', type=int, default=80, help='Mutări per joc')
+    parser.add_argument('--seed', type=int, default=1, help='Sămânță pentru mutările aleatorii')
+    args = parser.parse_args()
+
+    from app import create_new_game
+
+    rng = random.Random(args.seed)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = GameStore(create_new_game, idle_seconds=0, sweep_interval=float('inf'))
+    for index in range(args.games):
+        store[str(index)] = _random_game(create_new_game, args.plies, rng)
+    live_bytes = tracemalloc.get_traced_memory()[0] - before
+
+    store.compact_idle(limit=args.games)
+    compact_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # Timpii sunt măsurați fără tracemalloc, care încetinește alocările
+    snapshot_bytes = store.metrics()['compacted_bytes']
+    revive_times = []
+    for index in range(args.games):
+        start = time.perf_counter()
+        store[str(index)]
+        revive_times.append(time.perf_counter() - start)
+    revive_times.sort()
+
+    start = time.perf_counter()
+    store.compact_idle(now=time.monotonic() + 1, limit=args.games)
+    compact_seconds = time.perf_counter() - start
+
+    print(f'{args.games} jocuri x {args.plies} mutări')
+    print(f'Memorie jocuri active:  {live_bytes / args.games:,.0f} octeți/joc')
+    print(f'Memorie după compactare: {compact_bytes / args.games:,.0f} octeți/joc '
+          f'(instantaneu: {snapshot_bytes / args.games:,.0f} octeți/joc)')
+    print(f'Compactare (cu verificare): {compact_seconds / args.games * 1e6:.0f} µs/joc')
+    print(f'Reconstruire: medie {sum(revive_times) / len(revive_times) * 1000:.2f} ms, '
+          f'p95 {revive_times[int((len(revive_times) - 1) * 0.95)] * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
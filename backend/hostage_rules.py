@@ -0,0 +1,198 @@
+"""
+Regulile specifice Hostage Chess care nu sunt acoperite de python-chess:
+plasarea pieselor din rezerve și schimbul de ostatici.
+"""
+import chess
+import chess.polyglot
+
+# Valorile pieselor folosite pentru regula schimbului de ostatici
+PIECE_VALUES = {'p': 1, 'n': 3, 'b': 3, 'r': 5, 'q': 9}
+
+# Pionii nu pot fi plasați pe prima sau ultima linie
+PAWN_DROP_MASK = ~(chess.BB_RANK_1 | chess.BB_RANK_8) & chess.BB_ALL
+
+
+def color_of(board):
+    """Culoarea la mutare, în notația 'w'/'b' a stării jocului."""
+    return 'w' if board.turn == chess.WHITE else 'b'
+
+
+def opponent_of(color):
+    return 'b' if color == 'w' else 'w'
+
+
+def drop_mask(board):
+    """
+    Bitboard-ul pătratelor pe care jucătorul la mutare poate plasa o piesă.
+    În șah, plasarea trebuie să blocheze linia unei piese care dă șah;
+    la șah dublu sau de la cal/pion nu există plasări legale.
+    """
+    empty = ~board.occupied & chess.BB_ALL
+    checkers = board.checkers_mask()
+    if not checkers:
+        return empty
+
+    if chess.popcount(checkers) > 1:
+        return chess.BB_EMPTY
+    king = board.king(board.turn)
+    checker = chess.msb(checkers)
+    return chess.between(king, checker) & empty
+
+
+def legal_drop_squares(board, piece_type, mask=None):
+    """
+    Pătratele legale pentru plasarea unei piese din rezerve de tipul piece_type.
+
+    Args:
+        board (chess.Board): Tabla curentă; plasează jucătorul la mutare.
+        piece_type (str): Tipul piesei ('p', 'n', 'b', 'r', 'q').
+        mask (int, opțional): Rezultatul drop_mask(board), dacă e deja calculat.
+    """
+    mask = drop_mask(board) if mask is None else mask
+    if piece_type.lower() == 'p':
+        mask &= PAWN_DROP_MASK
+    return [chess.square_name(square) for square in chess.scan_forward(mask)]
+
+
+def exchange_pairs(hostages, color):
+    """
+    Schimburile de ostatici posibile pentru culoarea color, câte unul pentru
+    fiecare pereche distinctă de tipuri. Piesa dată (un ostatic deținut de color)
+    trebuie să valoreze cel puțin cât piesa primită (un ostatic al adversarului).
+
+    Returns:
+        list: dict-uri cu 'give', 'receive', 'given_idx', 'received_idx'.
+    """
+    given_types = {}
+    for idx, hostage in enumerate(hostages.get(color, [])):
+        given_types.setdefault(hostage['type'].lower(), idx)
+    received_types = {}
+    for idx, hostage in enumerate(hostages.get(opponent_of(color), [])):
+        received_types.setdefault(hostage['type'].lower(), idx)
+
+    pairs = []
+    for give, given_idx in given_types.items():
+        for receive, received_idx in received_types.items():
+            if PIECE_VALUES.get(give, 0) >= PIECE_VALUES.get(receive, 0):
+                pairs.append({
+                    'give': give,
+                    'receive': receive,
+                    'given_idx': given_idx,
+                    'received_idx': received_idx
+                })
+    return pairs
+
+
+def legal_actions(game_state):
+    """
+    Toate acțiunile legale ale jucătorului la mutare: mutări grupate după
+    pătratul de plecare, pătratele de plasare pentru fiecare tip din rezerve
+    și schimburile de ostatici posibile.
+    """
+    board = game_state['board']
+    color = color_of(board)
+
+    moves = {}
+    for move in board.generate_legal_moves():
+        moves.setdefault(chess.square_name(move.from_square), []).append(move.uci())
+
+    mask = drop_mask(board)
+    drops = {}
+    for piece in game_state['reserves'].get(color, []):
+        piece_type = piece['type'].lower()
+        if piece_type not in drops:
+            drops[piece_type] = legal_drop_squares(board, piece_type, mask)
+
+    # Schimbul consumă rândul, deci nu poate fi folosit pentru a ieși din șah
+    exchanges = [] if board.is_check() else exchange_pairs(game_state['hostages'], color)
+
+    return {
+        'turn': color,
+        'moves': moves,
+        'drops': drops,
+        'exchanges': exchanges
+    }
+
+
+def has_legal_drop(game_state):
+    """True dacă jucătorul la mutare poate plasa cel puțin o piesă din rezerve."""
+    board = game_state['board']
+    reserves = game_state['reserves'].get(color_of(board))
+    if not reserves:
+        return False
+    mask = drop_mask(board)
+    return any(mask & PAWN_DROP_MASK if piece['type'].lower() == 'p' else mask for piece in reserves)
+
+
+def has_legal_action(game_state):
+    """
+    True dacă jucătorul la mutare are o acțiune legală: o mutare pe tablă, o plasare
+    (în șah, doar una care blochează) sau, în afara șahului, un schimb de ostatici.
+    """
+    board = game_state['board']
+    if any(board.generate_legal_moves()) or has_legal_drop(game_state):
+        return True
+    return not board.is_check() and bool(exchange_pairs(game_state['hostages'], color_of(board)))
+
+
+def is_checkmate(game_state):
+    """Mat: șah fără mutări pe tablă și fără o plasare care să blocheze șahul."""
+    return game_state['board'].is_check() and not has_legal_action(game_state)
+
+
+def is_stalemate(game_state):
+    """Pat: fără șah și fără nicio acțiune legală (mutare, plasare sau schimb)."""
+    return not game_state['board'].is_check() and not has_legal_action(game_state)
+
+
+def is_insufficient_material(game_state):
+    """
+    Remiză prin material insuficient. Spre deosebire de python-chess, care vede doar
+    tabla, o piesă în rezerve poate fi plasată, iar ostaticii pot fi schimbați
+    dacă ambele culori au, deci poziția nu e moartă.
+    """
+    if not game_state['board'].is_insufficient_material():
+        return False
+    reserves = game_state['reserves']
+    if reserves.get('w') or reserves.get('b'):
+        return False
+    hostages = game_state['hostages']
+    return not (hostages.get('w') and hostages.get('b'))
+
+
+def is_repetition(game_state, count=3):
+    """
+    Echivalentul lui board.is_repetition(count), sigur pentru plasări și schimburi.
+    Acestea sunt în stiva tablei mutări nule, iar python-chess nu le poate
+    reaplica: board.is_repetition() scoate mutări din stivă și le pune la loc,
+    iar piesa plasată dispare. Aici se scoate doar dintr-o copie, iar căutarea
+    se oprește la prima mutare nulă (rezervele și ostaticii s-au schimbat, deci
+    pozițiile anterioare nu mai pot fi aceleași).
+    """
+    board = game_state['board']
+    if len(board.move_stack) < count - 1:
+        return False
+
+    board = board.copy()
+    key = chess.polyglot.zobrist_hash(board)
+    while board.move_stack:
+        move = board.pop()
+        if not move or board.is_irreversible(move):
+            break
+        if chess.polyglot.zobrist_hash(board) == key:
+            count -= 1
+            if count <= 1:
+                return True
+    return False
+
+
+def is_game_over(game_state, repetition=True):
+    """
+    Echivalentul lui board.is_game_over(), cu matul, patul și materialul insuficient
+    calculate ca mai sus (plasările și schimburile țin jocul în viață).
+    Repetiția de cinci ori e verificată cu is_repetition, care parcurge istoricul
+    tablei; căutarea o sare (repetition=False), fiind verificată o dată la rădăcină.
+    """
+    board = game_state['board']
+    return (not has_legal_action(game_state) or is_insufficient_material(game_state)
+            or board.is_seventyfive_moves() or (repetition and is_repetition(game_state, 5)))
@@ -0,0 +1,277 @@
+"""
+Generator de încărcare pentru serverul Hostage Chess.
+
+Simulează N jucători concurenți care joacă partide împotriva AI-ului prin
+/new_ai_game, /make_move și /ai_move, cu un amestec configurabil de dificultăți.
+Rulează fie împotriva unui server local (--url), fie direct pe clientul de test Flask.
+La final raportează throughput-ul, latențele p50/p95/p99 pe endpoint, ratele de eroare
+și evoluția memoriei (RSS) a serverului în timp.
+
+Exemple:
+    python load_generator.py --players 8 --games 2 --mix easy:0.7,medium:0.3
+    python load_generator.py --url http://localhost:5000 --server-pid 12345 --players 32
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+import chess
+
+
+class TestClientTransport:
+    """Trimite cererile direct în aplicația Flask, fără rețea."""
+
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def post(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpTransport:
+    """Trimite cererile prin HTTP către un server pornit separat."""
+
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def post(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            try:
+                body = json.loads(e.read() or b'{}')
+            except ValueError:
+                body = {}
+            return e.code, body
+        except (urllib.error.URLError, OSError) as e:
+            return 0, {'error': str(e)}
+
+
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rss_samples = []
+        self.games_finished = 0
+
+    def record(self, endpoint, elapsed, ok):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def report(self, duration):
+        """Construiește raportul final ca dicționar serializabil JSON."""
+        endpoints = {}
+        total_requests = 0
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            total_requests += len(values)
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': self.errors[endpoint],
+                'error_rate': self.errors[endpoint] / len(values),
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': values[-1] * 1000
+            }
+        return {
+            'duration_s': duration,
+            'requests': total_requests,
+            'throughput_rps': total_requests / duration if duration else 0.0,
+            'games_finished': self.games_finished,
+            'endpoints': endpoints,
+            'rss_mb': [{'t': t, 'rss_mb': rss / (1024 * 1024)} for t, rss in self.rss_samples]
+        }
+
+
+def percentile(sorted_values, pct):
+    """Percentila pct dintr-o listă sortată (interpolare liniară)."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def read_rss(pid=None):
+    """RSS-ul curent al procesului (în octeți), citit din /proc când e disponibil."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid is None:
+        # Rezervă pentru sisteme fără /proc: vârful de memorie (kilobytes pe Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+
+def parse_mix(text):
+    """Parsează 'easy:0.5,medium:0.3,hard:0.2' într-o listă de (dificultate, pondere)."""
+    mix = []
+    for part in text.split(','):
+        name, _, weight = part.partition(':')
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+def play_game(transport, stats, difficulty, max_plies, rng):
+    """Joacă o partidă cu mutări aleatorii ale jucătorului uman simulat."""
+
+    def call(endpoint, payload):
+        start = time.perf_counter()
+        status, body = transport.post(endpoint, payload)
+        stats.record(endpoint, time.perf_counter() - start, status < 400 and status != 0)
+        return status, body
+
+    status, body = call('/new_ai_game', {'player_color': 'w', 'difficulty': difficulty})
+    if status >= 400 or status == 0:
+        return
+    game_id = body['game_id']
+    board = chess.Board(body['fen'])
+
+    for _ in range(max_plies):
+        legal_moves = list(board.legal_moves)
+        if not legal_moves:
+            break
+        status, body = call('/make_move', {'game_id': game_id, 'move': rng.choice(legal_moves).uci()})
+        if status >= 400 or status == 0 or body.get('game_over'):
+            break
+        board = chess.Board(body['fen'])
+
+        status, body = call('/ai_move', {'game_id': game_id, 'difficulty': difficulty})
+        if status >= 400 or status == 0 or body.get('game_over'):
+            break
+        if 'fen' in body:
+            board = chess.Board(body['fen'])
+
+    with stats.lock:
+        stats.games_finished += 1
+
+
+def run_load_test(transport_factory, players=4, games_per_player=1, max_plies=20,
+                  mix=(('medium', 1.0),), rss_pid=None, rss_interval=1.0, seed=None):
+    """
+    Rulează testul de încărcare și returnează raportul.
+
+    Args:
+        transport_factory (callable): Creează un transport pentru fiecare jucător.
+        players (int): Numărul de jucători concurenți.
+        games_per_player (int): Câte partide joacă fiecare jucător.
+        max_plies (int): Numărul maxim de mutări ale jucătorului într-o partidă.
+        mix (list): Perechi (dificultate, pondere).
+        rss_pid (int, opțional): PID-ul serverului; implicit procesul curent.
+        rss_interval (float): Intervalul de eșantionare a memoriei, în secunde
+            (None dezactivează eșantionarea).
+        seed (int, opțional): Sămânța pentru mutările aleatorii.
+    """
+    stats = LoadStats()
+    difficulties = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    done = threading.Event()
+    start = time.perf_counter()
+
+    def sample_rss():
+        while not done.is_set():
+            rss = read_rss(rss_pid)
+            if rss is not None:
+                stats.rss_samples.append((round(time.perf_counter() - start, 3), rss))
+            done.wait(rss_interval)
+
+    def player(index):
+        rng = random.Random(None if seed is None else seed + index)
+        transport = transport_factory()
+        for _ in range(games_per_player):
+            difficulty = rng.choices(difficulties, weights)[0]
+            play_game(transport, stats, difficulty, max_plies, rng)
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    if rss_interval:
+        sampler.start()
+    threads = [threading.Thread(target=player, args=(index,)) for index in range(players)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    if rss_interval:
+        sampler.join()
+
+    return stats.report(time.perf_counter() - start)
+
+
+def print_report(report):
+    print(f"Durată: {report['duration_s']:.2f}s, cereri: {report['requests']}, "
+          f"throughput: {report['throughput_rps']:.1f} req/s, partide: {report['games_finished']}")
+    print(f"{'endpoint':<14}{'cereri':>8}{'erori':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, data in report['endpoints'].items():
+        print(f"{endpoint:<14}{data['requests']:>8}{data['errors']:>8}"
+              f"{data['p50_ms']:>10.1f}{data['p95_ms']:>10.1f}{data['p99_ms']:>10.1f}{data['max_ms']:>10.1f}")
+    if report['rss_mb']:
+        samples = ', '.join(f"{s['t']:.0f}s={s['rss_mb']:.1f}MB" for s in report['rss_mb'])
+        print(f'RSS server: {samples}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Test de încărcare pentru serverul Hostage Chess')
+    parser.add_argument('--url', help='URL-ul serverului; implicit se folosește clientul de test Flask')
+    parser.add_argument('--players', type=int, default=4, help='Jucători concurenți')
+    parser.add_argument('--games', type=int, default=1, help='Partide per jucător')
+    parser.add_argument('--max-plies', type=int, default=20, help='Mutări maxime ale jucătorului per partidă')
+    parser.add_argument('--mix', default='easy:0.5,medium:0.4,hard:0.1', help='Amestecul de dificultăți')
+    parser.add_argument('--server-pid', type=int, help='PID-ul serverului pentru măsurarea RSS')
+    parser.add_argument('--rss-interval', type=float, default=1.0, help='Interval eșantionare RSS (s)')
+    parser.add_argument('--seed', type=int, help='Sămânță pentru reproductibilitate')
+    parser.add_argument('--json', action='store_true', help='Afișează raportul ca JSON')
+    args = parser.parse_args()
+
+    if args.url:
+        transport_factory = lambda: HttpTransport(args.url)
+        rss_pid = args.server_pid
+    else:
+        from app import app as flask_app
+        transport_factory = lambda: TestClientTransport(flask_app)
+        rss_pid = os.getpid()
+
+    report = run_load_test(
+        transport_factory,
+        players=args.players,
+        games_per_player=args.games,
+        max_plies=args.max_plies,
+        mix=parse_mix(args.mix),
+        rss_pid=rss_pid,
+        # Fără PID, memoria serverului HTTP nu poate fi măsurată
+        rss_interval=args.rss_interval if rss_pid else None,
+        seed=args.seed
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
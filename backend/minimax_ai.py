@@ -3,18 +3,48 @@ Algoritm Minimax îmbunătățit pentru Hostage Chess
 Acest modul implementează algoritmul minimax cu alpha-beta pruning specializat pentru Hostage Chess.
 """
 import chess
+import chess.polyglot
 import random
 from copy import deepcopy
 
+from endgame_tables import default_tables
+from engine_session import HISTORY_CAP
+from hostage_rules import (PAWN_DROP_MASK, drop_mask, exchange_pairs, has_legal_action, is_game_over,
+                           is_insufficient_material)
+
+# Tipurile de intrări din tabela de transpoziții
+TT_EXACT = 0
+TT_LOWER = 1  # Valoarea reală e cel puțin valoarea stocată
+TT_UPPER = 2  # Valoarea reală e cel mult valoarea stocată
+
+# Plasările din rezerve păstrate după filtrul static, înainte de căutare
+DROP_CANDIDATES = 8
+
+# Bonusurile de ordonare pentru mutările killer și scorul history maxim (sub cel pentru șah)
+KILLER_BONUS = 8
+HISTORY_BONUS = 6
+
+# Câștigul minim (în unități de evaluare) pentru care AI-ul face un schimb de ostatici
+EXCHANGE_MARGIN = 0.5
+# Numărul maxim de decizii de schimb memorate per instanță
+EXCHANGE_CACHE_SIZE = 4096
+
 class MinimaxAI:
-    def __init__(self, depth=3):
+    def __init__(self, depth=3, tables=True):
         """
         Inițializează AI-ul cu o anumită adâncime de căutare.
         
         Args:
             depth (int): Adâncimea maximă de căutare în arborele de joc.
+            tables (EndgameTables | bool): Tabelele de final consultate în căutare;
+                True folosește tabelele implicite ale procesului, False le dezactivează.
         """
         self.depth = depth
+        if tables is True:
+            tables = default_tables()
+        self.tables = tables or None
+        self.nodes = 0  # Nodurile vizitate de _minimax, pentru măsurarea vitezei
+        self.exchange_cache = {}  # Deciziile de schimb, după cheia poziției
         self.piece_values = {
             chess.PAWN: 1,
             chess.KNIGHT: 3,
@@ -88,16 +118,60 @@ class MinimaxAI:
             ]
         }
         
-    def get_best_move(self, game_state):
+    def get_best_move(self, game_state, progress_callback=None, depth=None, session=None):
         """
         Determină cea mai bună mutare pentru starea curentă a jocului.
         
         Args:
             game_state (dict): Starea jocului curent.
+            progress_callback (callable, opțional): Dacă este dat, căutarea se face prin
+                iterative deepening, iar funcția este apelată după fiecare adâncime
+                completă cu (adâncime, mutare, valoare).
+            depth (int, opțional): Adâncimea acestei căutări; implicit self.depth.
+                Nu modifică self.depth, deci instanța poate fi folosită din mai multe fire.
+            session (EngineSession, opțional): Starea păstrată între mutările jocului
+                (tabela de transpoziții, killer, history, varianta principală).
+                Dacă sesiunea e folosită de altă căutare, se caută fără ea.
             
         Returns:
             tuple: (mutarea cea mai bună, valoarea acesteia)
         """
+        depth = depth or self.depth
+        if session is not None and not session.lock.acquire(blocking=False):
+            session = None
+        try:
+            first_move = None
+            if session is not None:
+                session.begin_search()
+                first_move = session.expected_move(self._position_key(game_state))
+            
+            if progress_callback is None:
+                best_move, best_value = self._search_root(game_state, depth, first_move, session)
+            else:
+                best_move = first_move
+                best_value = None
+                for current_depth in range(1, depth + 1):
+                    # Mutarea cea mai bună de la adâncimea anterioară e căutată prima
+                    best_move, best_value = self._search_root(game_state, current_depth, best_move, session)
+                    progress_callback(current_depth, best_move, best_value)
+            
+            if session is not None and best_move is not None:
+                # Varianta principală așteptată: rădăcina, apoi mutările din tabela de transpoziții
+                keys = [self._position_key(game_state)]
+                child_state = self._make_move_copy(game_state, best_move)
+                moves = [best_move] + self._principal_variation(child_state, session.table, depth - 1, keys)
+                session.set_principal_variation(keys, moves)
+        finally:
+            if session is not None:
+                session.end_search()
+                session.lock.release()
+        
+        return best_move, best_value
+    
+    def _search_root(self, game_state, depth, first_move=None, session=None):
+        """
+        Caută la rădăcină până la adâncimea dată.
+        """
         board = game_state['board']
         is_maximizing = board.turn == chess.WHITE
         
@@ -109,13 +183,17 @@ class MinimaxAI:
         # Generează toate mutările posibile și le sortează pentru o căutare mai eficientă
         legal_moves = list(board.legal_moves)
         legal_moves = self._order_moves(board, legal_moves)
+        if first_move in legal_moves:
+            legal_moves.remove(first_move)
+            legal_moves.insert(0, first_move)
         
         for move in legal_moves:
             # Creează o copie a stării jocului pentru simulare
             new_game_state = self._make_move_copy(game_state, move)
             
             # Apelează minimax recursiv
-            value = self._minimax(new_game_state, self.depth - 1, alpha, beta, not is_maximizing)
+            value = self._minimax(new_game_state, depth - 1, alpha, beta, not is_maximizing,
+                                  session=session, ply=1)
             
             # Actualizează cea mai bună mutare
             if is_maximizing:
@@ -135,14 +213,21 @@ class MinimaxAI:
         
         return best_move, best_value
     
-    def _order_moves(self, board, moves):
+    def _order_moves(self, board, moves, killers=(), history=None):
         """
         Sortează mutările pentru a optimiza alpha-beta pruning.
         Mutările de captură și cele care dau șah sunt evaluate primele.
+        Mutările killer și scorurile history (din sesiunea jocului) ridică
+        mutările fără captură care au produs tăieturi în pozițiile surori.
         """
         def move_priority(move):
             priority = 0
             
+            if move in killers:
+                priority += KILLER_BONUS
+            if history:
+                priority += history.get(move, 0) * HISTORY_BONUS / HISTORY_CAP
+            
             # Capturări au prioritate mare
             if board.is_capture(move):
                 captured_piece = board.piece_at(move.to_square)
@@ -205,40 +290,203 @@ class MinimaxAI:
         
         return new_game_state
     
-    def _minimax(self, game_state, depth, alpha, beta, is_maximizing):
+    def _minimax(self, game_state, depth, alpha, beta, is_maximizing, table=None, session=None, ply=0):
         """
         Implementarea recursivă a algoritmului minimax cu alpha-beta pruning.
+        Dacă se dă o tabelă de transpoziții (dict), pozițiile deja căutate sunt
+        refolosite, iar cea mai bună mutare găsită este încercată prima.
+        Cu o sesiune de joc, se folosește tabela ei (limitată la max_entries),
+        iar tăieturile actualizează mutările killer de pe ply și tabela history.
         """
         board = game_state['board']
+        self.nodes += 1
+        
+        # Finalurile acoperite de tabele au valoarea exactă, fără căutare
+        if self.tables is not None:
+            table_value = self.tables.evaluate(game_state)
+            if table_value is not None:
+                return table_value
         
-        # Verifică condițiile de bază pentru oprirea recursiei
-        if depth == 0 or board.is_game_over():
+        # Verifică condițiile de bază pentru oprirea recursiei; repetiția parcurge tot
+        # istoricul tablei, deci e verificată doar la rădăcină, de apelant
+        if depth == 0 or is_game_over(game_state, repetition=False):
             return self._evaluate_position(game_state)
+        
+        generation = 0
+        if session is not None:
+            table = session.table
+            generation = session.generation
+        
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        if table is not None:
+            key = self._position_key(game_state)
+            entry = table.get(key)
+            if entry:
+                entry_depth, entry_value, entry_flag, tt_move = entry[:4]
+                if entry_depth >= depth:
+                    if entry_flag == TT_EXACT:
+                        return entry_value
+                    if entry_flag == TT_LOWER:
+                        alpha = max(alpha, entry_value)
+                    else:
+                        beta = min(beta, entry_value)
+                    if beta <= alpha:
+                        return entry_value
+        
+        legal_moves = list(board.legal_moves)
+        if not legal_moves:
+            # Jocul continuă doar prin plasări sau schimburi, pe care căutarea nu le explorează
+            return self._evaluate_position(game_state)
+        if session is not None:
+            legal_moves = self._order_moves(
+                board, legal_moves, session.killers.get(ply, ()), session.history
+            )
+        else:
+            legal_moves = self._order_moves(board, legal_moves)
+        if tt_move in legal_moves:
+            legal_moves.remove(tt_move)
+            legal_moves.insert(0, tt_move)
+        best_move = None
             
         if is_maximizing:
             value = float('-inf')
-            legal_moves = self._order_moves(board, list(board.legal_moves))
             
             for move in legal_moves:
                 new_game_state = self._make_move_copy(game_state, move)
-                value = max(value, self._minimax(new_game_state, depth - 1, alpha, beta, False))
+                child_value = self._minimax(new_game_state, depth - 1, alpha, beta, False, table, session, ply + 1)
+                if child_value > value:
+                    value = child_value
+                    best_move = move
                 alpha = max(alpha, value)
                 
                 if beta <= alpha:
                     break
-            return value
         else:
             value = float('inf')
-            legal_moves = self._order_moves(board, list(board.legal_moves))
             
             for move in legal_moves:
                 new_game_state = self._make_move_copy(game_state, move)
-                value = min(value, self._minimax(new_game_state, depth - 1, alpha, beta, True))
+                child_value = self._minimax(new_game_state, depth - 1, alpha, beta, True, table, session, ply + 1)
+                if child_value < value:
+                    value = child_value
+                    best_move = move
                 beta = min(beta, value)
                 
                 if beta <= alpha:
                     break
-            return value
+        
+        if session is not None and beta <= alpha and not board.is_capture(best_move):
+            session.add_killer(ply, best_move)
+            session.add_history(best_move, depth)
+        
+        if table is not None:
+            if value <= alpha_orig:
+                flag = TT_UPPER
+            elif value >= beta_orig:
+                flag = TT_LOWER
+            else:
+                flag = TT_EXACT
+            # Tabela sesiunii nu crește peste limită; intrările existente pot fi rescrise
+            if session is None or len(table) < session.max_entries or key in table:
+                table[key] = (depth, value, flag, best_move, generation)
+        return value
+    
+    def _position_key(self, game_state):
+        """Cheia poziției: hash Zobrist al tablei plus ostaticii și rezervele."""
+        hostages = game_state['hostages']
+        reserves = game_state['reserves']
+        return (
+            chess.polyglot.zobrist_hash(game_state['board']),
+            tuple(sorted(hostage['type'] for hostage in hostages['w'])),
+            tuple(sorted(hostage['type'] for hostage in hostages['b'])),
+            tuple(sorted(piece['type'] for piece in reserves['w'])),
+            tuple(sorted(piece['type'] for piece in reserves['b']))
+        )
+    
+    def get_top_moves(self, game_state, n=3, depth=None, progress_callback=None):
+        """
+        Analiză multi-PV: cele mai bune n mutări de la rădăcină, cu variantele
+        principale și scorurile lor, prin iterative deepening. Toate liniile și
+        toate adâncimile folosesc aceeași tabelă de transpoziții.
+        
+        Args:
+            game_state (dict): Starea jocului curent.
+            n (int): Numărul de linii returnate.
+            depth (int, opțional): Adâncimea maximă; implicit self.depth.
+            progress_callback (callable, opțional): Apelată după fiecare adâncime
+                completă cu (adâncime, linii).
+            
+        Returns:
+            list: dict-uri {'move', 'value', 'pv'}, de la cea mai bună linie.
+        """
+        lines = []
+        for current_depth, lines in self.iter_top_moves(game_state, n, depth):
+            if progress_callback is not None:
+                progress_callback(current_depth, lines)
+        return lines
+    
+    def iter_top_moves(self, game_state, n=3, depth=None):
+        """
+        Generator pentru get_top_moves: produce (adâncime, linii) după fiecare
+        adâncime completă, ca rezultatele intermediare să poată fi transmise în flux.
+        """
+        depth = depth or self.depth
+        board = game_state['board']
+        is_maximizing = board.turn == chess.WHITE
+        table = {}
+        lines = []
+        
+        for current_depth in range(1, depth + 1):
+            # Liniile bune de la adâncimea anterioară sunt căutate primele
+            previous = [line['move'] for line in lines]
+            legal_moves = self._order_moves(board, list(board.legal_moves))
+            legal_moves = previous + [move for move in legal_moves if move not in previous]
+            
+            scored = []
+            for move in legal_moves:
+                new_game_state = self._make_move_copy(game_state, move)
+                # Fereastra e limitată de a n-a linie: mutările mai slabe primesc doar o limită
+                if is_maximizing:
+                    alpha = scored[n - 1][0] if len(scored) >= n else float('-inf')
+                    value = self._minimax(new_game_state, current_depth - 1, alpha, float('inf'), False, table)
+                    if value <= alpha:
+                        continue
+                else:
+                    beta = scored[n - 1][0] if len(scored) >= n else float('inf')
+                    value = self._minimax(new_game_state, current_depth - 1, float('-inf'), beta, True, table)
+                    if value >= beta:
+                        continue
+                scored.append((value, move, new_game_state))
+                scored.sort(key=lambda item: item[0], reverse=is_maximizing)
+                del scored[n:]
+            
+            lines = [
+                {
+                    'move': move,
+                    'value': value,
+                    'pv': [move] + self._principal_variation(child_state, table, current_depth - 1)
+                }
+                for value, move, child_state in scored
+            ]
+            yield current_depth, lines
+    
+    def _principal_variation(self, game_state, table, max_length, keys=None):
+        """
+        Reconstruiește varianta principală urmând mutările din tabela de transpoziții.
+        Dacă se dă lista keys, îi adaugă cheia fiecărei poziții din care s-a jucat o mutare.
+        """
+        pv = []
+        while len(pv) < max_length:
+            key = self._position_key(game_state)
+            entry = table.get(key)
+            if not entry or entry[3] is None or entry[3] not in game_state['board'].legal_moves:
+                break
+            pv.append(entry[3])
+            if keys is not None:
+                keys.append(key)
+            game_state = self._make_move_copy(game_state, entry[3])
+        return pv
     
     def _evaluate_position(self, game_state):
         """
@@ -248,10 +496,12 @@ class MinimaxAI:
         hostages = game_state['hostages']
         reserves = game_state['reserves']
         
-        # Verifică dacă jocul s-a terminat
-        if board.is_checkmate():
-            return 10000 if board.turn == chess.BLACK else -10000
-        elif board.is_stalemate() or board.is_insufficient_material():
+        # Verifică dacă jocul s-a terminat (plasările și schimburile pot evita matul sau patul)
+        if not has_legal_action(game_state):
+            if board.is_check():
+                return 10000 if board.turn == chess.BLACK else -10000
+            return 0.0
+        elif is_insufficient_material(game_state):
             return 0.0
         
         score = 0.0
@@ -280,35 +530,40 @@ class MinimaxAI:
         
         return score
     
+    def evaluate_positions(self, game_states):
+        """
+        Evaluează static o listă de stări de joc, una câte una (o buclă peste
+        _evaluate_position, fără vectorizare).
+        
+        Args:
+            game_states (list): Stări de joc (board, hostages, reserves).
+            
+        Returns:
+            list: Evaluările, în aceeași ordine (pozitiv = avantaj alb).
+        """
+        return [self._evaluate_position(game_state) for game_state in game_states]
+    
     def _evaluate_material(self, board):
-        """Evaluează materialul de pe tablă."""
+        """Evaluează materialul de pe tablă (popcount pe bitboard-uri, nu pătrat cu pătrat)."""
         score = 0.0
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
         
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                value = self.piece_values[piece.piece_type]
-                if piece.color == chess.WHITE:
-                    score += value
-                else:
-                    score -= value
+        for piece_type, value in self.piece_values.items():
+            mask = board.pieces_mask(piece_type, chess.WHITE) | board.pieces_mask(piece_type, chess.BLACK)
+            score += value * (chess.popcount(mask & white) - chess.popcount(mask & black))
         
         return score
     
     def _evaluate_piece_positions(self, board):
-        """Evaluează poziționarea pieselor."""
+        """Evaluează poziționarea pieselor, parcurgând doar pătratele ocupate."""
         score = 0.0
         
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece and piece.piece_type in self.position_tables:
-                position_index = square if piece.color == chess.WHITE else 63 - square
-                position_value = self.position_tables[piece.piece_type][position_index]
-                
-                if piece.color == chess.WHITE:
-                    score += position_value
-                else:
-                    score -= position_value
+        for piece_type, table in self.position_tables.items():
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.WHITE)):
+                score += table[square]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.BLACK)):
+                score -= table[63 - square]
         
         return score
     
@@ -356,11 +611,11 @@ class MinimaxAI:
     
     def _evaluate_mobility(self, board):
         """Evaluează mobilitatea pieselor."""
-        white_moves = len(list(board.legal_moves)) if board.turn == chess.WHITE else 0
+        white_moves = board.legal_moves.count() if board.turn == chess.WHITE else 0
         
         # Schimbă rândul pentru a evalua mutările negrului
         board.turn = not board.turn
-        black_moves = len(list(board.legal_moves)) if board.turn == chess.BLACK else 0
+        black_moves = board.legal_moves.count() if board.turn == chess.BLACK else 0
         board.turn = not board.turn  # Restaurează rândul original
         
         return (white_moves - black_moves) * 0.1
@@ -404,126 +659,288 @@ class MinimaxAI:
         }
         return conversion.get(char.lower(), chess.PAWN)
     
-    def should_make_hostage_exchange(self, game_state, ai_color='b'):
+    def should_make_hostage_exchange(self, game_state, ai_color='b', depth=None, normal_move=None):
         """
         Determină dacă AI-ul ar trebui să facă un schimb de ostatici.
-        """
-        hostages = game_state['hostages']
-        ai_hostages = hostages.get(ai_color, [])
-        opponent_hostages = hostages.get('w' if ai_color == 'b' else 'b', [])
         
-        if not ai_hostages or not opponent_hostages:
+        Ostaticii sunt grupați pe tipuri (hostage_rules.exchange_pairs), deci se evaluează
+        doar perechile distincte de tipuri permise de regulă (piesa dată valorează cel puțin
+        cât cea primită). Fiecare pereche e evaluată prin linia schimb -> răspunsul
+        adversarului -> plasarea piesei primite și comparată cu cea mai bună mutare
+        normală a AI-ului căutată la aceeași adâncime. Rezultatele sunt memorate per poziție.
+        
+        Args:
+            normal_move (tuple, opțional): (mutare, valoare) deja căutată pentru această
+                poziție la aceeași adâncime; implicit e căutată aici.
+        
+        Returns:
+            dict: {'ai_idx', 'opp_idx', 'ai_piece', 'opp_piece', 'value'} sau None.
+        """
+        board = game_state['board']
+        if board.turn != (chess.WHITE if ai_color == 'w' else chess.BLACK) or board.is_check():
             return None
         
-        # Caută cel mai avantajos schimb
-        best_exchange = None
-        best_value = -1000
+        depth = depth or self.depth
+        key = (self._position_key(game_state), ai_color, depth)
+        if key in self.exchange_cache:
+            decision = self.exchange_cache[key]
+        else:
+            decision = self._best_exchange_types(game_state, ai_color, depth, normal_move)
+            if len(self.exchange_cache) >= EXCHANGE_CACHE_SIZE:
+                self.exchange_cache.clear()
+            self.exchange_cache[key] = decision
         
-        for ai_idx, ai_hostage in enumerate(ai_hostages):
-            ai_value = self.piece_values[self._char_to_piece_type(ai_hostage['type'])]
-            
-            for opp_idx, opp_hostage in enumerate(opponent_hostages):
-                opp_value = self.piece_values[self._char_to_piece_type(opp_hostage['type'])]
-                
-                # AI-ul acceptă doar schimburi egale sau avantajoase
-                if ai_value <= opp_value:
-                    exchange_value = opp_value - ai_value
-                    
-                    if exchange_value > best_value:
-                        best_value = exchange_value
-                        best_exchange = {
-                            'ai_idx': ai_idx,
-                            'opp_idx': opp_idx,
-                            'ai_piece': ai_hostage,
-                            'opp_piece': opp_hostage,
-                            'value': exchange_value
-                        }
-        
-        # Acceptă schimbul dacă e avantajos sau cel puțin egal
-        if best_exchange and best_value >= 0:
-            return best_exchange
-            
-        return None
+        if decision is None:
+            return None
+        
+        # Cache-ul reține tipurile; indicii se recalculează pe listele curente
+        give, receive, value = decision
+        opponent_color = 'w' if ai_color == 'b' else 'b'
+        ai_hostages = game_state['hostages'][ai_color]
+        opponent_hostages = game_state['hostages'][opponent_color]
+        ai_idx = next(idx for idx, hostage in enumerate(ai_hostages) if hostage['type'].lower() == give)
+        opp_idx = next(idx for idx, hostage in enumerate(opponent_hostages) if hostage['type'].lower() == receive)
+        return {
+            'ai_idx': ai_idx,
+            'opp_idx': opp_idx,
+            'ai_piece': ai_hostages[ai_idx],
+            'opp_piece': opponent_hostages[opp_idx],
+            'value': value
+        }
     
-    def get_best_reserve_placement(self, game_state, ai_color='b'):
+    def _best_exchange_types(self, game_state, ai_color, depth, normal_move=None):
         """
-        Determină cea mai bună plasare pentru o piesă din rezerve.
+        Cel mai bun schimb ca (tip dat, tip primit, câștig) sau None dacă niciun
+        schimb nu e mai bun decât cea mai bună mutare normală cu cel puțin EXCHANGE_MARGIN.
         """
-        reserves = game_state['reserves'].get(ai_color, [])
-        if not reserves:
+        pairs = exchange_pairs(game_state['hostages'], ai_color)
+        if not pairs:
             return None
         
-        board = game_state['board']
+        # Câștigul e calculat din perspectiva AI-ului (evaluarea e pozitivă pentru alb).
+        # Referința e mutarea normală la aceeași adâncime: o trecere a rândului ar lăsa
+        # AI-ul cu o acțiune mai puțin decât linia cu schimb și plasare.
+        sign = 1 if ai_color == 'w' else -1
+        best_move, move_value = normal_move or self._search_root(game_state, depth)
+        if best_move is None:
+            # Fără mutări pe tablă, schimbul e comparat cu poziția curentă
+            move_value = self._evaluate_position(game_state)
+        baseline = sign * move_value
+        
+        best = None
+        for pair in pairs:
+            gain = sign * self._exchange_line_value(game_state, ai_color, depth, pair) - baseline
+            if gain >= EXCHANGE_MARGIN and (best is None or gain > best[2]):
+                best = (pair['give'], pair['receive'], gain)
+        return best
+    
+    def _exchange_line_value(self, game_state, ai_color, depth, pair):
+        """
+        Valoarea liniei: schimbul, cel mai bun răspuns al adversarului căutat la aceeași
+        adâncime ca mutarea normală de referință și apoi cea mai bună plasare a AI-ului,
+        căutată la depth - 1. Fără plasări legale, linia se încheie cu evaluarea statică.
+        """
+        state = self._make_exchange_copy(game_state, ai_color, pair['given_idx'], pair['received_idx'])
+        
+        if is_game_over(state, repetition=False):
+            return self._evaluate_position(state)
+        reply, _ = self._search_root(state, depth)
+        if reply is not None:
+            state = self._make_move_copy(state, reply)
+        if is_game_over(state, repetition=False):
+            return self._evaluate_position(state)
+        
+        # În șah, drop_mask lasă doar plasările care blochează șahul
+        placement = self.get_best_reserve_placement(state, ai_color, max(1, depth - 1))
+        if placement is None:
+            return self._evaluate_position(state)
+        return placement['value']
+    
+    def _make_exchange_copy(self, game_state, color, given_idx, received_idx):
+        """
+        Creează o copie a stării jocului și execută pe ea schimbul de ostatici.
+        """
+        opponent_color = 'w' if color == 'b' else 'b'
+        new_game_state = {
+            'board': game_state['board'].copy(),
+            'hostages': deepcopy(game_state['hostages']),
+            'reserves': deepcopy(game_state['reserves']),
+            'turn_phase': game_state.get('turn_phase', 'normal'),
+            'last_move': game_state.get('last_move', None)
+        }
         
-        # Alege cea mai valoroasă piesă din rezerve
-        best_piece_idx = 0
-        best_piece_value = 0
+        new_game_state['hostages'][color].pop(given_idx)
+        received = new_game_state['hostages'][opponent_color].pop(received_idx)
+        new_game_state['reserves'][color].append({'type': received['type'], 'color': color})
+        # Schimbul consumă rândul
+        new_game_state['board'].push(chess.Move.null())
         
-        for idx, piece in enumerate(reserves):
-            value = self.piece_values[self._char_to_piece_type(piece['type'])]
-            if value > best_piece_value:
-                best_piece_value = value
-                best_piece_idx = idx
+        return new_game_state
+    
+    def should_drop_piece(self, game_state, ai_color='b', depth=None, normal_move=None):
+        """
+        Determină dacă AI-ul ar trebui să plaseze o piesă din rezerve în loc de o mutare normală.
         
-        selected_piece = reserves[best_piece_idx]
+        Cea mai bună plasare e comparată cu cea mai bună mutare normală căutată la aceeași
+        adâncime și e aleasă doar dacă e strict mai bună. Fără mutări pe tablă (ex. în
+        șah, când doar o plasare blochează), plasarea e singura acțiune.
         
-        # Găsește cea mai bună poziție strategică
-        best_square = self._find_best_placement_square(board, selected_piece['type'], ai_color)
+        Args:
+            normal_move (tuple, opțional): (mutare, valoare) deja căutată pentru această
+                poziție la aceeași adâncime; implicit e căutată aici.
         
-        if best_square:
-            return {
-                'piece_idx': best_piece_idx,
-                'piece': selected_piece,
-                'square': best_square
-            }
+        Returns:
+            dict: Plasarea (ca la get_best_reserve_placement) sau None.
+        """
+        depth = depth or self.depth
+        placement = self.get_best_reserve_placement(game_state, ai_color, depth)
+        if placement is None:
+            return None
         
-        return None
+        best_move, move_value = normal_move or self._search_root(game_state, depth)
+        if best_move is None:
+            return placement
+        # Evaluarea e pozitivă pentru alb
+        sign = 1 if ai_color == 'w' else -1
+        if sign * (placement['value'] - move_value) <= 0:
+            return None
+        return placement
     
-    def _find_best_placement_square(self, board, piece_type, color):
+    def get_best_reserve_placement(self, game_state, ai_color='b', depth=None):
         """
-        Găsește cea mai bună poziție pentru plasarea unei piese din rezerve.
+        Determină cea mai bună plasare a unei piese din rezerve printr-o căutare scurtă.
+        
+        Candidații (tip de piesă × pătrat legal) sunt filtrați static cu tabelele de
+        poziții și măștile de atac, apoi doar cei mai buni DROP_CANDIDATES sunt căutați
+        cu minimax, așa că o plasare costă cam cât o mutare normală.
+        
+        Args:
+            game_state (dict): Starea jocului curent.
+            ai_color (str): Culoarea care plasează ('w' sau 'b').
+            depth (int, opțional): Adâncimea căutării, inclusiv plasarea; implicit self.depth.
+            
+        Returns:
+            dict: {'piece_idx', 'piece', 'square', 'value'} sau None dacă nu există plasări.
         """
-        # Prioritizează pozițiile în funcție de tipul piesei și strategia AI-ului
-        if color == 'b':  # AI-ul e negru
-            preferred_ranks = [2, 3, 1]  # Prefer rândurile din mijloc și aproape de bază
-        else:
-            preferred_ranks = [5, 4, 6]
+        depth = depth or self.depth
+        candidates = self._drop_candidates(game_state, ai_color)
+        if not candidates:
+            return None
+        
+        is_maximizing = ai_color == 'w'
+        best = None
+        best_value = float('-inf') if is_maximizing else float('inf')
+        alpha = float('-inf')
+        beta = float('inf')
+        table = {}
+        
+        for _, piece_idx, square in candidates:
+            new_game_state = self._make_drop_copy(game_state, ai_color, piece_idx, square)
+            value = self._minimax(new_game_state, depth - 1, alpha, beta, not is_maximizing, table)
+            
+            if is_maximizing:
+                if value > best_value:
+                    best_value = value
+                    best = (piece_idx, square)
+                alpha = max(alpha, best_value)
+            else:
+                if value < best_value:
+                    best_value = value
+                    best = (piece_idx, square)
+                beta = min(beta, best_value)
         
-        best_square = None
-        best_score = -1000
+        piece_idx, square = best
+        return {
+            'piece_idx': piece_idx,
+            'piece': game_state['reserves'][ai_color][piece_idx],
+            'square': chess.square_name(square),
+            'value': best_value
+        }
+    
+    def _drop_candidates(self, game_state, color):
+        """
+        Plasările legale, ordonate după scorul static și limitate la DROP_CANDIDATES.
         
-        for rank in preferred_ranks:
-            for file in range(8):
-                square = chess.square(file, rank)
+        Returns:
+            list: tupluri (scor, indexul piesei în rezerve, pătrat).
+        """
+        board = game_state['board']
+        chess_color = chess.WHITE if color == 'w' else chess.BLACK
+        mask = drop_mask(board)
+        enemy_king = board.king(not chess_color)
+        
+        candidates = []
+        seen_types = set()
+        for piece_idx, piece in enumerate(game_state['reserves'].get(color, [])):
+            piece_type = self._char_to_piece_type(piece['type'])
+            # Piesele de același tip au aceleași plasări
+            if piece_type in seen_types or piece_type == chess.KING:
+                continue
+            seen_types.add(piece_type)
+            
+            value = self.piece_values[piece_type]
+            table = self.position_tables[piece_type]
+            type_mask = mask & PAWN_DROP_MASK if piece_type == chess.PAWN else mask
+            
+            for square in chess.scan_forward(type_mask):
+                score = value * 10 + (table[square] if chess_color == chess.WHITE else table[63 - square])
                 
-                # Verifică dacă pătratul e liber
-                if not board.piece_at(square):
-                    square_score = self._evaluate_placement_square(board, square, piece_type, color)
-                    
-                    if square_score > best_score:
-                        best_score = square_score
-                        best_square = chess.square_name(square)
+                attacks = self._drop_attacks(board, piece_type, square, chess_color)
+                # Amenințări asupra pieselor adverse, plus bonus pentru șah
+                for target in chess.scan_forward(attacks & board.occupied_co[not chess_color]):
+                    target_type = board.piece_type_at(target)
+                    if target_type != chess.KING:
+                        score += self.piece_values[target_type] * 3
+                if enemy_king is not None and attacks & chess.BB_SQUARES[enemy_king]:
+                    score += 30
+                
+                # Piesa plasată pe un pătrat atacat și neapărat poate fi capturată imediat
+                if board.is_attacked_by(not chess_color, square):
+                    defended = board.is_attacked_by(chess_color, square)
+                    score -= value * (5 if defended else 15)
+                
+                candidates.append((score, piece_idx, square))
         
-        return best_square
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return candidates[:DROP_CANDIDATES]
+    
+    def _drop_attacks(self, board, piece_type, square, color):
+        """Masca de atac a unei piese plasate pe square, din tabelele precalculate ale python-chess."""
+        occupied = board.occupied
+        if piece_type == chess.PAWN:
+            return chess.BB_PAWN_ATTACKS[color][square]
+        if piece_type == chess.KNIGHT:
+            return chess.BB_KNIGHT_ATTACKS[square]
+        
+        attacks = chess.BB_EMPTY
+        if piece_type in (chess.BISHOP, chess.QUEEN):
+            attacks |= chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+        if piece_type in (chess.ROOK, chess.QUEEN):
+            attacks |= (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+                        | chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied])
+        return attacks
     
-    def _evaluate_placement_square(self, board, square, piece_type, color):
+    def _make_drop_copy(self, game_state, color, piece_idx, square):
         """
-        Evaluează cât de bună este o poziție pentru plasarea unei piese.
+        Creează o copie a stării jocului și plasează pe ea piesa din rezerve.
         """
-        score = 0.0
+        new_game_state = {
+            'board': game_state['board'].copy(),
+            'hostages': deepcopy(game_state['hostages']),
+            'reserves': deepcopy(game_state['reserves']),
+            'turn_phase': game_state.get('turn_phase', 'normal'),
+            'last_move': game_state.get('last_move', None)
+        }
         
-        # Bonus pentru centru
-        file = chess.square_file(square)
-        rank = chess.square_rank(square)
-        center_distance = abs(3.5 - file) + abs(3.5 - rank)
-        score -= center_distance * 5
-        
-        # Bonus pentru protecția altor piese
-        for adj_square in [square + 8, square - 8, square + 1, square - 1]:
-            if 0 <= adj_square <= 63:
-                piece = board.piece_at(adj_square)
-                if piece and piece.color == (chess.WHITE if color == 'w' else chess.BLACK):
-                    score += 10
+        board = new_game_state['board']
+        piece = new_game_state['reserves'][color].pop(piece_idx)
+        # BaseBoard.set_piece_at nu golește stiva de mutări (Board.set_piece_at ar face-o)
+        chess.BaseBoard.set_piece_at(
+            board,
+            square,
+            chess.Piece(self._char_to_piece_type(piece['type']), chess.WHITE if color == 'w' else chess.BLACK)
+        )
+        # Plasarea consumă rândul
+        board.push(chess.Move.null())
         
-       
-        return score
\ No newline at end of file
+        return new_game_state
@@ -0,0 +1,171 @@
+"""
+Profilarea la cerere a unei singure cereri HTTP.
+
+Cu header-ul X-Profile (sau ?profile=) o cerere rulează sub cProfile, iar
+răspunsul primește un header Server-Timing cu timpii pe punctele fierbinți ale
+motorului și un câmp 'profile' (pentru răspunsurile JSON) cu funcțiile cele mai
+costisitoare. Cu valoarea 'flame', un fir separat eșantionează și stiva cererii,
+iar rezultatul e scris ca fișier de stive pliate ("a;b;c N"), citit de
+flamegraph.pl sau speedscope.
+
+Profilarea trebuie permisă din server (app.config['PROFILING_ENABLED'], variabila
+HOSTAGE_PROFILING); altfel header-ul e ignorat. Fără flag, singurul cost e
+verificarea header-ului și a parametrului. Directorul flamegraph-urilor păstrează
+doar cele mai recente max_files fișiere.
+
+Până la Python 3.11, cProfile urmărește doar firul cererii. De la 3.12 rulează
+peste sys.monitoring, care înregistrează toate firele procesului, deci timpii
+din Server-Timing și 'top_functions' includ și munca cererilor simultane
+(PROFILE_SCOPE = 'process', raportat în răspuns). Flamegraph-ul eșantionează
+întotdeauna doar firul cererii.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# Punctele fierbinți raportate în Server-Timing: (fișier, funcții). Timpii sunt
+# inclusivi, deci se suprapun (ex. evaluarea include generarea de mutări).
+HOT_PATHS = {
+    'order_moves': ('minimax_ai.py', ('_order_moves',)),
+    'make_move_copy': ('minimax_ai.py', ('_make_move_copy', '_make_drop_copy', '_make_exchange_copy')),
+    'evaluate': ('minimax_ai.py', ('_evaluate_position',)),
+    'movegen': (os.path.join('chess', '__init__.py'), ('generate_legal_moves',)),
+    'json': (os.path.join('flask', 'json', '__init__.py'), ('jsonify',)),
+}
+
+# Firele acoperite de cProfile: pe Python 3.12+ (sys.monitoring) toate firele procesului
+PROFILE_SCOPE = 'process' if sys.version_info >= (3, 12) else 'thread'
+
+# cProfile nu acceptă două profilări simultane pe Python 3.12+, deci se profilează o cerere pe rând
+_active = threading.Lock()
+
+
+def requested_mode(headers, args):
+    """
+    Modul cerut de client: None (fără profilare), 'timers' sau 'flame'.
+    Acceptă X-Profile: 1/flame sau ?profile=1/flame.
+    """
+    value = headers.get('X-Profile') or args.get('profile')
+    if not value or value in ('0', 'false', 'off'):
+        return None
+    return 'flame' if value == 'flame' else 'timers'
+
+
+class RequestProfile:
+    def __init__(self, flamegraph=False, interval=0.001):
+        """
+        Args:
+            flamegraph (bool): Eșantionează și stivele pentru un flamegraph.
+            interval (float): Intervalul de eșantionare, în secunde.
+        """
+        self.flamegraph = flamegraph
+        self.interval = interval
+        self.profiler = cProfile.Profile()
+        self.stacks = Counter()
+        self.started_at = None
+        self.elapsed = 0.0
+        self.running = False
+        self._stop = threading.Event()
+        self._sampler = None
+        self._stats = None
+
+    def start(self):
+        """Pornește profilarea pe firul curent. Returnează False dacă altă cerere e profilată."""
+        if not _active.acquire(blocking=False):
+            return False
+        self.running = True
+        if self.flamegraph:
+            self._sampler = threading.Thread(
+                target=self._sample, args=(threading.get_ident(),), daemon=True
+            )
+            self._sampler.start()
+        self.started_at = time.perf_counter()
+        self.profiler.enable()
+        return True
+
+    def stop(self):
+        """Oprește profilarea; poate fi apelată de mai multe ori."""
+        if not self.running:
+            return
+        self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.started_at
+        self.running = False
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+        _active.release()
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stats(self):
+        if self._stats is None:
+            self._stats = pstats.Stats(self.profiler).stats
+        return self._stats
+
+    def breakdown(self):
+        """Timpii inclusivi (ms) pe punctele fierbinți din HOT_PATHS, plus totalul."""
+        timings = {name: 0.0 for name in HOT_PATHS}
+        for (filename, _, function), (_, _, _, cumulative, _) in self.stats().items():
+            for name, (suffix, functions) in HOT_PATHS.items():
+                if function in functions and filename.endswith(suffix):
+                    timings[name] += cumulative * 1000
+        timings['total'] = self.elapsed * 1000
+        return timings
+
+    def top_functions(self, limit=15):
+        """Funcțiile cu cel mai mare timp propriu (exclusiv)."""
+        rows = sorted(self.stats().items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            {
+                'function': f'{os.path.basename(filename)}:{line}:{function}',
+                'calls': calls,
+                'own_ms': own * 1000,
+                'cumulative_ms': cumulative * 1000
+            }
+            for (filename, line, function), (_, calls, own, cumulative, _) in rows
+        ]
+
+    def server_timing(self):
+        """Valoarea header-ului Server-Timing; aria profilării e descrisă la 'total'."""
+        return ', '.join(
+            f'{name};dur={value:.2f}' + (f';desc="{PROFILE_SCOPE}"' if name == 'total' else '')
+            for name, value in self.breakdown().items()
+        )
+
+    def write_folded(self, directory, label, max_files=None):
+        """
+        Scrie stivele eșantionate în format pliat; returnează calea fișierului.
+        Cu max_files, fișierele .folded cele mai vechi din director sunt șterse.
+        """
+        os.makedirs(directory, exist_ok=True)
+        safe_label = ''.join(char if char.isalnum() else '_' for char in label or 'request')
+        path = os.path.join(directory, f'{time.time_ns() // 1_000_000}-{safe_label}-{os.getpid()}.folded')
+        with open(path, 'w', encoding='utf-8') as fp:
+            for stack, count in self.stacks.most_common():
+                fp.write(f'{stack} {count}\n')
+        if max_files is not None:
+            _rotate(directory, max_files)
+        return path
+
+
+def _rotate(directory, max_files):
+    # Numele încep cu timpul în milisecunde, deci ordinea alfabetică e cea cronologică
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.folded'))
+    for name in files[:-max_files] if max_files > 0 else files:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # Șters deja de alt proces
@@ -0,0 +1,173 @@
+"""
+Controlul admiterii pentru căutările AI-ului.
+Limitează numărul de căutări simultane la numărul de nuclee, pune restul într-o
+coadă FIFO cu timp maxim de așteptare și, sub încărcare, reduce adâncimea căutării.
+Un loc eliberat trece direct la cea mai veche cerere din coadă, deci o cerere nou
+sosită nu poate depăși cererile care așteaptă deja.
+O cerere care folosește mai multe procese (ex. analiza în lot) ocupă câte un loc
+per proces, ca împreună cu căutările interactive să nu depășească nucleele.
+Când coada e plină, cererea este respinsă cu SchedulerBusy (503 + Retry-After).
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class SchedulerBusy(Exception):
+    def __init__(self, retry_after, reason):
+        """
+        Args:
+            retry_after (int): Secundele recomandate clientului înainte de a reîncerca.
+            reason (str): 'queue_full' sau 'wait_timeout'.
+        """
+        super().__init__(f'Search scheduler busy ({reason})')
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class SearchScheduler:
+    def __init__(self, max_concurrent=None, max_queue=None, max_wait=10.0, min_depth=1):
+        """
+        Inițializează planificatorul de căutări.
+
+        Args:
+            max_concurrent (int): Căutări simultane; implicit numărul de nuclee.
+            max_queue (int): Lungimea maximă a cozii; implicit 4 * max_concurrent.
+            max_wait (float): Timpul maxim de așteptare în coadă, în secunde.
+            min_depth (int): Adâncimea minimă la care poate fi redusă o căutare.
+        """
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else self.max_concurrent * 4
+        self.max_wait = max_wait
+        self.min_depth = min_depth
+
+        self.lock = threading.Lock()
+        self.running = 0
+        self.queue = deque()  # (Event, locuri) per cerere în așteptare, în ordinea sosirii
+
+        # Metrici
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.degraded = 0
+        self.wait_times = deque(maxlen=1000)
+        self.search_times = deque(maxlen=1000)
+
+    @contextmanager
+    def search_slot(self, depth, slots=1):
+        """
+        Rezervă `slots` locuri pentru o căutare și returnează adâncimea efectivă.
+
+        Raises:
+            SchedulerBusy: Dacă coada e plină sau așteptarea depășește max_wait.
+        """
+        effective_depth = self.acquire(depth, slots)
+        started_at = time.perf_counter()
+        try:
+            yield effective_depth
+        finally:
+            self.release(started_at, slots)
+
+    def acquire(self, depth, slots=1):
+        """
+        Variantă fără context manager a lui search_slot, pentru căutări care se
+        termină după ce handler-ul a returnat (ex. răspunsuri în flux).
+        Fiecare acquire reușit trebuie urmat de release(started_at, slots).
+        """
+        slots = min(slots, self.max_concurrent)
+        enqueued_at = time.perf_counter()
+        with self.lock:
+            if self.running + slots <= self.max_concurrent and not self.queue:
+                self.running += slots
+                return self._admit(depth, enqueued_at)
+
+            if len(self.queue) >= self.max_queue:
+                self.rejected += 1
+                raise SchedulerBusy(self._retry_after(), 'queue_full')
+            turn = threading.Event()
+            entry = (turn, slots)
+            self.queue.append(entry)
+
+        turn.wait(self.max_wait)
+        with self.lock:
+            # Locul poate fi primit chiar după expirarea așteptării; e verificat sub lock
+            if not turn.is_set():
+                self.queue.remove(entry)
+                # O cerere mare din capul cozii poate bloca cererile mici din spatele ei
+                self._hand_off()
+                self.timed_out += 1
+                raise SchedulerBusy(self._retry_after(), 'wait_timeout')
+            return self._admit(depth, enqueued_at)
+
+    def release(self, started_at, slots=1):
+        """
+        Eliberează locurile ocupate de o căutare începută la started_at. Locurile
+        trec direct la cererile din capul cozii, în ordine, cât timp încap.
+        """
+        with self.lock:
+            self.search_times.append(time.perf_counter() - started_at)
+            self.running -= min(slots, self.max_concurrent)
+            self._hand_off()
+
+    def _hand_off(self):
+        # Apelată sub lock; running include cererile primite înainte ca firele lor să se trezească
+        while self.queue and self.running + self.queue[0][1] <= self.max_concurrent:
+            turn, slots = self.queue.popleft()
+            self.running += slots
+            turn.set()
+
+    @property
+    def waiting(self):
+        return len(self.queue)
+
+    def _admit(self, depth, enqueued_at):
+        # Apelată sub lock, după ce cererea a primit un loc (running include deja cererea)
+        waited = time.perf_counter() - enqueued_at
+        effective_depth = self._degrade(depth, waited)
+        if effective_depth < depth:
+            self.degraded += 1
+        self.admitted += 1
+        self.wait_times.append(waited)
+        return effective_depth
+
+    def _degrade(self, depth, waited):
+        """
+        Reduce adâncimea în funcție de presiunea pe coadă: câte un nivel când
+        există cereri în așteptare, încă unul când coada e pe jumătate plină
+        sau cererea a așteptat mai mult de jumătate din max_wait.
+        """
+        reduction = 0
+        if self.waiting > 0:
+            reduction += 1
+        if self.waiting * 2 >= self.max_queue > 0 or waited * 2 >= self.max_wait:
+            reduction += 1
+        return max(self.min_depth, depth - reduction)
+
+    def _retry_after(self):
+        # Estimare: timpul mediu al unei căutări × câte "valuri" sunt în fața clientului
+        average = sum(self.search_times) / len(self.search_times) if self.search_times else 1.0
+        waves = (self.waiting + self.running) / self.max_concurrent
+        return max(1, math.ceil(average * waves))
+
+    def metrics(self):
+        """Starea curentă a cozii și statisticile de așteptare."""
+        with self.lock:
+            waits = sorted(self.wait_times)
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'running': self.running,
+                'queue_depth': self.waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'degraded': self.degraded,
+                'wait_ms_avg': sum(waits) / len(waits) * 1000 if waits else 0.0,
+                'wait_ms_p95': waits[int((len(waits) - 1) * 0.95)] * 1000 if waits else 0.0,
+                'wait_ms_max': waits[-1] * 1000 if waits else 0.0,
+                'search_ms_avg': (sum(self.search_times) / len(self.search_times) * 1000
+                                  if self.search_times else 0.0)
+            }
@@ -0,0 +1,348 @@
+"""
+Turneu de self-play pentru testarea regresiilor motorului.
+
+Joacă partide de Hostage Chess între două configurații de MinimaxAI, pe aceeași
+cale de reguli ca app.py (schimb de ostatici, apoi plasare din rezerve, apoi
+mutare normală). Partidele pornesc din deschideri dintr-o carte, fiecare jucată
+cu ambele culori, și sunt distribuite pe un pool de procese. Testul se oprește
+prin SPRT (test secvențial al raportului de verosimilitate) și raportează
+diferența Elo și nodurile pe secundă ale fiecărei configurații.
+
+Exemple:
+    python selfplay.py --a depth=3 --b depth=2 --games 200
+    python selfplay.py --a movetime=0.5 --b movetime=0.5,cls=minimax_ai_nou:MinimaxAI
+"""
+import argparse
+import importlib
+import math
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+
+from hostage_rules import is_checkmate, is_insufficient_material, is_repetition, is_stalemate
+
+# Deschideri scurte (UCI), folosite ca poziții de start
+DEFAULT_BOOK = [
+    'e2e4 e7e5 g1f3 b8c6',
+    'e2e4 c7c5 g1f3 d7d6',
+    'e2e4 e7e6 d2d4 d7d5',
+    'e2e4 c7c6 d2d4 d7d5',
+    'd2d4 d7d5 c2c4 e7e6',
+    'd2d4 g8f6 c2c4 g7g6',
+    'd2d4 d7d5 c2c4 c7c6',
+    'c2c4 e7e5 b1c3 g8f6',
+    'g1f3 d7d5 g2g3 g8f6',
+    'e2e4 d7d5 e4d5 d8d5',
+    'e2e4 e7e5 f2f4 e5f4',
+    'd2d4 g8f6 c2c4 e7e6',
+]
+
+
+def parse_config(text):
+    """
+    Parsează o configurație 'depth=3,movetime=0.5,cls=modul:Clasa,name=A'.
+    Cheile necunoscute sunt transmise constructorului motorului.
+    """
+    config = {}
+    for part in filter(None, text.split(',')):
+        key, _, value = part.partition('=')
+        key = key.strip()
+        value = value.strip()
+        if key in ('cls', 'name'):
+            config[key] = value
+        else:
+            config[key] = float(value) if '.' in value else int(value)
+    return config
+
+
+def create_engine(config):
+    """Instanțiază motorul descris de configurație."""
+    module_name, _, class_name = config.get('cls', 'minimax_ai:MinimaxAI').partition(':')
+    engine_class = getattr(importlib.import_module(module_name), class_name)
+    kwargs = {key: value for key, value in config.items() if key not in ('cls', 'name', 'movetime')}
+    return engine_class(**kwargs)
+
+
+def choose_move(engine, game_state, config):
+    """
+    Alege mutarea motorului. Cu 'movetime', adâncimea crește iterativ cât timp
+    următoarea iterație (estimată la de 4 ori cea anterioară) încape în buget.
+    """
+    movetime = config.get('movetime')
+    if not movetime:
+        return engine.get_best_move(game_state)[0]
+
+    max_depth = config.get('depth', 8)
+    start = time.perf_counter()
+    best_move = None
+    for depth in range(1, max_depth + 1):
+        depth_start = time.perf_counter()
+        best_move = engine.get_best_move(game_state, depth=depth)[0]
+        elapsed = time.perf_counter() - start
+        if elapsed + (time.perf_counter() - depth_start) * 4 > movetime:
+            break
+    return best_move
+
+
+def game_result(game_state, max_plies):
+    """
+    Rezultatul partidei din perspectiva albului (1, 0.5, 0) sau None dacă continuă.
+    Repetiția e verificată cu hostage_rules.is_repetition: board.is_repetition()
+    ar pierde piesele plasate din rezerve.
+    """
+    board = game_state['board']
+    if is_checkmate(game_state):
+        return 0.0 if board.turn == chess.WHITE else 1.0
+    if (is_stalemate(game_state) or is_insufficient_material(game_state) or board.is_fifty_moves()
+            or is_repetition(game_state, 3) or len(board.move_stack) >= max_plies):
+        return 0.5
+    return None
+
+
+def play_game(opening, config_white, config_black, max_plies=200):
+    """
+    Joacă o partidă completă; rulează în procesele din pool.
+
+    Returns:
+        dict: Rezultatul pentru alb și statisticile fiecărei culori.
+    """
+    # Același cod de reguli ca serverul (app.py), inclusiv schimburi și plasări
+    from app import create_new_game, try_ai_hostage_exchange, try_ai_piece_drop
+
+    game_state = create_new_game()
+    history = game_state['history']
+    for uci in opening.split():
+        history.push_move(game_state, chess.Move.from_uci(uci))
+
+    engines = {'w': create_engine(config_white), 'b': create_engine(config_black)}
+    configs = {'w': config_white, 'b': config_black}
+    stats = {color: {'nodes': 0, 'seconds': 0.0} for color in engines}
+    board = game_state['board']
+
+    result = game_result(game_state, max_plies)
+    while result is None:
+        color = 'w' if board.turn == chess.WHITE else 'b'
+        engine = engines[color]
+
+        start = time.perf_counter()
+        nodes_before = getattr(engine, 'nodes', 0)
+        depth = configs[color].get('depth')
+        # Fără buget de timp, mutarea normală e căutată o dată și servește ca referință
+        # pentru schimb și plasare, ca în /ai_move
+        normal_move = None if configs[color].get('movetime') else engine.get_best_move(game_state, depth=depth)
+        exchange = try_ai_hostage_exchange(game_state, color, depth=depth, engine=engine, normal_move=normal_move)
+        if exchange.get('action') != 'exchange':
+            drop = try_ai_piece_drop(game_state, color, depth=depth, engine=engine, normal_move=normal_move)
+            if drop.get('action') != 'drop':
+                move = normal_move[0] if normal_move else choose_move(engine, game_state, configs[color])
+                if move is None:
+                    break
+                history.push_move(game_state, move)
+        stats[color]['seconds'] += time.perf_counter() - start
+        stats[color]['nodes'] += getattr(engine, 'nodes', 0) - nodes_before
+
+        result = game_result(game_state, max_plies)
+
+    return {
+        'white_score': 0.5 if result is None else result,
+        'plies': len(board.move_stack),
+        'stats': stats
+    }
+
+
+def _play_pair_game(args):
+    opening, a_is_white, config_a, config_b, max_plies = args
+    if a_is_white:
+        game = play_game(opening, config_a, config_b, max_plies)
+        return game['white_score'], game['stats']['w'], game['stats']['b']
+    game = play_game(opening, config_b, config_a, max_plies)
+    return 1.0 - game['white_score'], game['stats']['b'], game['stats']['w']
+
+
+class SPRT:
+    """SPRT pe scorul mediu (aproximare normală pentru rezultate victorie/remiză/înfrângere)."""
+
+    def __init__(self, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05):
+        self.score0 = elo_to_score(elo0)
+        self.score1 = elo_to_score(elo1)
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    def llr(self, wins, draws, losses):
+        games = wins + draws + losses
+        if games == 0 or wins + losses == 0:
+            return 0.0
+        score = (wins + draws / 2) / games
+        variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+        if variance <= 0:
+            return 0.0
+        return games * (self.score1 - self.score0) * (2 * score - self.score0 - self.score1) / (2 * variance)
+
+    def decision(self, wins, draws, losses):
+        """'H1' (A e mai bun cu cel puțin elo1), 'H0' sau None dacă testul continuă."""
+        llr = self.llr(wins, draws, losses)
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+
+def elo_to_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_estimate(wins, draws, losses):
+    """Diferența Elo (A față de B) și marja de eroare de 95%."""
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, float('inf')
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    elo = score_to_elo(score)
+    return elo, (score_to_elo(score + margin) - score_to_elo(score - margin)) / 2
+
+
+def run_tournament(config_a, config_b, games=100, book=None, processes=None,
+                   max_plies=200, sprt=None, seed=None, on_game=None):
+    """
+    Rulează turneul până la `games` partide sau până la decizia SPRT.
+
+    Args:
+        config_a, config_b (dict): Configurațiile motoarelor (vezi parse_config).
+        games (int): Numărul maxim de partide (rotunjit la un număr par).
+        book (list): Deschideri UCI; implicit DEFAULT_BOOK.
+        processes (int): Procesele din pool; implicit numărul de nuclee.
+        max_plies (int): Partidele mai lungi sunt declarate remiză.
+        sprt (SPRT, opțional): Regula de oprire.
+        seed (int, opțional): Sămânța pentru ordinea deschiderilor.
+        on_game (callable, opțional): Apelată după fiecare partidă cu raportul curent.
+
+    Returns:
+        dict: Raportul turneului.
+    """
+    rng = random.Random(seed)
+    book = list(book or DEFAULT_BOOK)
+    processes = processes or os.cpu_count() or 1
+
+    def tasks():
+        # Fiecare deschidere e jucată de două ori, cu culorile inversate
+        for index in range((games + 1) // 2):
+            opening = book[index % len(book)] if index < len(book) else rng.choice(book)
+            yield (opening, True, config_a, config_b, max_plies)
+            yield (opening, False, config_a, config_b, max_plies)
+
+    totals = {'wins': 0, 'draws': 0, 'losses': 0}
+    engine_stats = {'a': {'nodes': 0, 'seconds': 0.0}, 'b': {'nodes': 0, 'seconds': 0.0}}
+    decision = None
+    start = time.perf_counter()
+
+    def report():
+        elo, margin = elo_estimate(totals['wins'], totals['draws'], totals['losses'])
+        return {
+            'games': sum(totals.values()),
+            **totals,
+            'elo': elo,
+            'elo_margin_95': margin,
+            'llr': sprt.llr(totals['wins'], totals['draws'], totals['losses']) if sprt else None,
+            'sprt_bounds': (sprt.lower, sprt.upper) if sprt else None,
+            'decision': decision,
+            'nps': {
+                key: stats['nodes'] / stats['seconds'] if stats['seconds'] else 0.0
+                for key, stats in engine_stats.items()
+            },
+            'seconds': time.perf_counter() - start
+        }
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = deque()
+        task_iter = tasks()
+        for task in task_iter:
+            pending.append(executor.submit(_play_pair_game, task))
+            if len(pending) >= processes * 2:
+                break
+
+        while pending:
+            score, stats_a, stats_b = pending.popleft().result()
+            if score == 1.0:
+                totals['wins'] += 1
+            elif score == 0.0:
+                totals['losses'] += 1
+            else:
+                totals['draws'] += 1
+            for key, stats in (('a', stats_a), ('b', stats_b)):
+                engine_stats[key]['nodes'] += stats['nodes']
+                engine_stats[key]['seconds'] += stats['seconds']
+
+            if on_game is not None:
+                on_game(report())
+
+            if sprt is not None:
+                decision = sprt.decision(totals['wins'], totals['draws'], totals['losses'])
+                if decision:
+                    for future in pending:
+                        future.cancel()
+                    break
+
+            next_task = next(task_iter, None)
+            if next_task is not None:
+                pending.append(executor.submit(_play_pair_game, next_task))
+
+    return report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Turneu de self-play între două configurații MinimaxAI')
+    parser.add_argument('--a', default='depth=3', help='Configurația A, ex. depth=3 sau movetime=0.5')
+    parser.add_argument('--b', default='depth=2', help='Configurația B')
+    parser.add_argument('--games', type=int, default=100, help='Numărul maxim de partide')
+    parser.add_argument('--book', help='Fișier cu deschideri, câte o linie UCI per rând')
+    parser.add_argument('--processes', type=int, help='Numărul de procese')
+    parser.add_argument('--max-plies', type=int, default=200, help='Limita de mutări (remiză)')
+    parser.add_argument('--elo0', type=float, default=0.0, help='Ipoteza H0 a SPRT (Elo)')
+    parser.add_argument('--elo1', type=float, default=5.0, help='Ipoteza H1 a SPRT (Elo)')
+    parser.add_argument('--no-sprt', action='store_true', help='Joacă toate partidele')
+    parser.add_argument('--seed', type=int, help='Sămânță pentru ordinea deschiderilor')
+    args = parser.parse_args()
+
+    book = None
+    if args.book:
+        with open(args.book, encoding='utf-8') as fp:
+            book = [line.strip() for line in fp if line.strip() and not line.startswith('#')]
+
+    def progress(report):
+        print(f"\r{report['games']} partide: +{report['wins']} ={report['draws']} -{report['losses']} "
+              f"Elo {report['elo']:+.1f} ±{report['elo_margin_95']:.1f}"
+              + (f" LLR {report['llr']:.2f}" if report['llr'] is not None else ''), end='', flush=True)
+
+    report = run_tournament(
+        parse_config(args.a), parse_config(args.b),
+        games=args.games,
+        book=book,
+        processes=args.processes,
+        max_plies=args.max_plies,
+        sprt=None if args.no_sprt else SPRT(args.elo0, args.elo1),
+        seed=args.seed,
+        on_game=progress
+    )
+    print()
+    print(f"Rezultat A vs B: +{report['wins']} ={report['draws']} -{report['losses']} "
+          f"în {report['games']} partide ({report['seconds']:.1f}s)")
+    print(f"Elo A - B: {report['elo']:+.1f} ±{report['elo_margin_95']:.1f} (95%)")
+    if report['decision']:
+        print(f"SPRT: {report['decision']} acceptată (LLR {report['llr']:.2f})")
+    print(f"Noduri/s: A {report['nps']['a']:.0f}, B {report['nps']['b']:.0f}")
+
+
+if __name__ == '__main__':
+    main()
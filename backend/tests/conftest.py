@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modulele backend-ului sunt plate (fără pachet), deci directorul lor e adăugat în sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
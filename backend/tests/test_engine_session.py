@@ -0,0 +1,41 @@
+import gc
+
+from engine_session import EngineSession, SessionBudget
+
+
+def _filled(budget, entries):
+    session = EngineSession(budget=budget)
+    session.table = {key: (1, 0, 0, None, 0) for key in range(entries)}
+    session.end_search()
+    return session
+
+
+def test_budget_evicts_least_recently_used_session():
+    budget = SessionBudget(max_entries=250)
+    oldest = _filled(budget, 100)
+    middle = _filled(budget, 100)
+    newest = _filled(budget, 100)
+
+    assert oldest.table == {}
+    assert len(middle.table) == 100 and len(newest.table) == 100
+    assert budget.metrics()['evictions'] == 1
+
+
+def test_budget_skips_session_in_search():
+    budget = SessionBudget(max_entries=150)
+    busy = _filled(budget, 100)
+    busy.lock.acquire()
+    try:
+        _filled(budget, 100)
+        assert len(busy.table) == 100
+    finally:
+        busy.lock.release()
+
+
+def test_budget_forgets_collected_sessions():
+    budget = SessionBudget()
+    session = _filled(budget, 10)
+    assert budget.metrics()['sessions'] == 1
+    del session
+    gc.collect()
+    assert budget.metrics() == {'sessions': 0, 'entries': 0, 'max_entries': budget.max_entries, 'evictions': 0}
@@ -0,0 +1,103 @@
+"""Testele de dus-întors pentru arhivele PGN extins și binar (.hcb)."""
+import io
+
+import chess
+import chess.pgn
+import pytest
+
+import game_archive
+
+# Mutări, captură cu ostatic de ambele părți, schimb și plasare, apoi o mutare a
+# pionului plasat pe care un parser PGN standard ar citi-o greșit (d2-d4 în loc de d3-d4)
+SAMPLE_ACTIONS = [
+    ('move', 'e2e4'), ('move', 'd7d5'), ('move', 'e4d5'), ('move', 'd8d5'),
+    ('exchange', 0, 0), ('move', 'd5a5'), ('drop', 0, 'd3'), ('move', 'g8f6'),
+    ('move', 'd3d4'), ('move', 'a5a2')
+]
+
+KEY_FIELDS = ('kind', 'color', 'move', 'reserve_idx', 'square', 'given_idx', 'received_idx')
+
+
+def play(actions):
+    game_state = game_archive.new_game_state()
+    history = game_state['history']
+    for action in actions:
+        color = 'w' if game_state['board'].turn == chess.WHITE else 'b'
+        if action[0] == 'move':
+            history.push_move(game_state, chess.Move.from_uci(action[1]))
+        elif action[0] == 'exchange':
+            history.push_exchange(game_state, color, action[1], action[2])
+        else:
+            history.push_drop(game_state, color, action[1], action[2])
+    return game_state
+
+
+def event_keys(events):
+    return [{key: event[key] for key in KEY_FIELDS if key in event} for event in events]
+
+
+def assert_same_game(record, game_state):
+    replayed = game_archive.replay_events(record['events'])
+    assert replayed['board'].fen() == game_state['board'].fen()
+    assert replayed['hostages'] == game_state['hostages']
+    assert replayed['reserves'] == game_state['reserves']
+    assert event_keys(record['events']) == event_keys(game_state['history'].to_list())
+
+
+@pytest.fixture
+def game_state():
+    return play(SAMPLE_ACTIONS)
+
+
+def test_pgn_round_trip(game_state):
+    record = game_archive.game_record(game_state, {'White': 'Ana', 'Black': 'AI'})
+    text = game_archive.record_to_pgn(record)
+    assert '{[%drop P d3]}' in text and '{[%exchange p p]}' in text
+
+    records = list(game_archive.read_pgn(io.StringIO(text)))
+    assert len(records) == 1
+    assert records[0]['headers']['White'] == 'Ana'
+    assert_same_game(records[0], game_state)
+
+
+def test_binary_round_trip(game_state):
+    record = game_archive.game_record(game_state, {'GameId': '1234'})
+    buffer = io.BytesIO()
+    assert game_archive.write_binary([record], buffer) == 1
+
+    buffer.seek(0)
+    records = list(game_archive.read_binary(buffer))
+    assert len(records) == 1
+    assert records[0]['headers'] == record['headers']
+    assert_same_game(records[0], game_state)
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_streams_several_games(binary):
+    games = [play(SAMPLE_ACTIONS[:length]) for length in (0, 3, 7, len(SAMPLE_ACTIONS))]
+    records = [game_archive.game_record(game) for game in games]
+    buffer = io.BytesIO() if binary else io.StringIO()
+    write = game_archive.write_binary if binary else game_archive.write_pgn
+    assert write(records, buffer) == len(games)
+
+    buffer.seek(0)
+    read = game_archive.read_binary if binary else game_archive.read_pgn
+    for read_record, game in zip(read(buffer), games, strict=True):
+        assert_same_game(read_record, game)
+
+
+def test_pgn_is_rejected_by_standard_parsers(game_state):
+    # Antetul Variant nu poate fi suprascris, ca jocul să nu fie citit greșit
+    record = game_archive.game_record(game_state, {'Variant': 'Standard'})
+    text = game_archive.record_to_pgn(record)
+    assert '[Variant "Hostage"]' in text
+    game = chess.pgn.read_game(io.StringIO(text))
+    assert any('unsupported variant' in str(error) for error in game.errors)
+
+
+def test_truncated_binary_is_rejected(game_state):
+    buffer = io.BytesIO()
+    game_archive.write_binary([game_archive.game_record(game_state)], buffer)
+    truncated = io.BytesIO(buffer.getvalue()[:-2])
+    with pytest.raises(ValueError):
+        list(game_archive.read_binary(truncated))
@@ -0,0 +1,98 @@
+"""Jurnalul de evenimente: plasări și schimburi cu undo/redo, state_at și repetiții."""
+import chess
+
+import hostage_rules
+from game_history import GameHistory
+
+# Plasarea calului pe e3, apoi caii se plimbă de trei ori între aceleași poziții
+KNIGHT_SHUFFLE = ['f6g8', 'f3g1', 'g8f6', 'g1f3'] * 3
+
+
+def new_state(reserves=None):
+    return {
+        'board': chess.Board(),
+        'hostages': {'w': [], 'b': []},
+        'reserves': {'w': [], 'b': [], **(reserves or {})},
+        'move_count': 0,
+        'last_move': None
+    }
+
+
+def snapshot(game_state):
+    return (game_state['board'].fen(), repr(game_state['hostages']), repr(game_state['reserves']),
+            game_state['move_count'], game_state['last_move'])
+
+
+def play_drop_game(history, game_state):
+    for uci in ['g1f3', 'g8f6']:
+        history.push_move(game_state, chess.Move.from_uci(uci))
+    history.push_drop(game_state, 'w', 0, 'e3')
+    for uci in KNIGHT_SHUFFLE:
+        history.push_move(game_state, chess.Move.from_uci(uci))
+
+
+def test_undo_redo_and_state_at_with_exchange_and_drop():
+    history = GameHistory(checkpoint_interval=4)
+    game_state = new_state()
+    snapshots = [snapshot(game_state)]
+    for uci in ['e2e4', 'd7d5', 'e4d5', 'd8d5']:
+        history.push_move(game_state, chess.Move.from_uci(uci))
+        snapshots.append(snapshot(game_state))
+    history.push_exchange(game_state, 'w', 0, 0)
+    snapshots.append(snapshot(game_state))
+    history.push_move(game_state, chess.Move.from_uci('d5a5'))
+    snapshots.append(snapshot(game_state))
+    history.push_drop(game_state, 'w', 0, 'd3')
+    snapshots.append(snapshot(game_state))
+    assert game_state['board'].piece_at(chess.D3) == chess.Piece(chess.PAWN, chess.WHITE)
+
+    for ply, expected in enumerate(snapshots):
+        assert snapshot(history.state_at(ply)) == expected
+
+    while history.can_undo():
+        history.undo(game_state)
+        assert snapshot(game_state) == snapshots[history.cursor]
+    while history.can_redo():
+        history.redo(game_state)
+        assert snapshot(game_state) == snapshots[history.cursor]
+
+
+def test_repetition_check_keeps_dropped_piece():
+    history = GameHistory()
+    game_state = new_state(reserves={'w': [{'type': 'n', 'color': 'w'}]})
+    play_drop_game(history, game_state)
+    knight = chess.Piece(chess.KNIGHT, chess.WHITE)
+
+    assert hostage_rules.is_repetition(game_state, 3)
+    assert not hostage_rules.is_repetition(game_state, 5)
+    assert not hostage_rules.is_game_over(game_state)
+    assert game_state['board'].piece_at(chess.E3) == knight
+    assert len(game_state['board'].move_stack) == 3 + len(KNIGHT_SHUFFLE)
+
+    history.undo(game_state)
+    history.redo(game_state)
+    assert game_state['board'].piece_at(chess.E3) == knight
+
+
+def test_repetition_stops_at_drop():
+    history = GameHistory()
+    game_state = new_state(reserves={'w': [{'type': 'n', 'color': 'w'}]})
+    for uci in ['g1f3', 'g8f6', 'f3g1', 'f6g8', 'g1f3', 'g8f6']:
+        history.push_move(game_state, chess.Move.from_uci(uci))
+    history.push_drop(game_state, 'w', 0, 'e3')
+    for uci in ['f6g8', 'f3g1', 'g8f6', 'g1f3']:
+        history.push_move(game_state, chess.Move.from_uci(uci))
+    # Poziția de după plasare apare de două ori; cele dinaintea plasării nu se numără
+    assert not hostage_rules.is_repetition(game_state, 3)
+    assert hostage_rules.is_repetition(game_state, 2)
+
+
+def test_fivefold_repetition_ends_game_and_keeps_dropped_piece():
+    history = GameHistory()
+    game_state = new_state(reserves={'w': [{'type': 'n', 'color': 'w'}]})
+    play_drop_game(history, game_state)
+    for uci in ['f6g8', 'f3g1', 'g8f6', 'g1f3']:
+        history.push_move(game_state, chess.Move.from_uci(uci))
+    assert hostage_rules.is_game_over(game_state)
+    assert not hostage_rules.is_game_over(game_state, repetition=False)
+    assert game_state['board'].piece_at(chess.E3) == chess.Piece(chess.KNIGHT, chess.WHITE)
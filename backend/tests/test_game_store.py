@@ -0,0 +1,58 @@
+"""Compactarea jocurilor inactive și reconstruirea lor la următorul acces."""
+import chess
+
+import game_archive
+from game_store import GameStore, compact_game, revive_game
+
+
+def play(game_state):
+    """Mutări cu capturi de ambele părți, un schimb de ostatici și o plasare."""
+    history = game_state['history']
+    for uci in ['e2e4', 'd7d5', 'e4d5', 'd8d5']:
+        history.push_move(game_state, chess.Move.from_uci(uci))
+    history.push_exchange(game_state, 'w', 0, 0)
+    history.push_move(game_state, chess.Move.from_uci('d5a5'))
+    history.push_drop(game_state, 'w', 0, 'd3')
+    history.push_move(game_state, chess.Move.from_uci('g8f6'))
+    return game_state
+
+
+def state_of(game_state):
+    return (game_state['board'].fen(), game_state['hostages'], game_state['reserves'],
+            game_state['history'].cursor, len(game_state['history'].events))
+
+
+def test_compact_and_revive_keep_redo_branch():
+    game_state = play(game_archive.new_game_state())
+    history = game_state['history']
+    history.undo(game_state)
+    history.undo(game_state)  # Plasarea rămâne de refăcut
+    game_state.update({'game_status': 'active', 'turn_phase': 'normal', 'version': 9,
+                       'field_versions': {'fen': 9, 'hostages': 4, 'reserves': 8}})
+
+    revived = revive_game(compact_game(game_state), game_archive.new_game_state)
+    assert state_of(revived) == state_of(game_state)
+    assert revived['version'] == 9 and revived['field_versions'] == game_state['field_versions']
+
+    for state in (game_state, revived):
+        state['history'].redo(state)
+        state['history'].redo(state)
+    assert state_of(revived) == state_of(game_state)
+    assert revived['board'].piece_at(chess.D3) == chess.Piece(chess.PAWN, chess.WHITE)
+
+
+def test_store_skips_games_kept_alive():
+    watched = {'a'}
+    released = []
+    store = GameStore(game_archive.new_game_state, idle_seconds=0, sweep_interval=float('inf'),
+                      on_release=released.append, keep_alive=watched.__contains__)
+    store['a'] = play(game_archive.new_game_state())
+    store['b'] = play(game_archive.new_game_state())
+    expected = state_of(store['b'])
+
+    assert store.compact_idle(now=store.last_access['b'] + 1) == 1
+    assert released == ['b']
+    assert store.metrics()['live'] == 1 and store.metrics()['compacted'] == 1
+
+    assert state_of(store['b']) == expected
+    assert store.metrics()['revivals'] == 1
@@ -0,0 +1,39 @@
+"""Matul și patul țin cont de plasările din rezerve și de schimburile de ostatici."""
+import chess
+
+import hostage_rules
+
+
+def make_state(fen, reserves=None, hostages=None):
+    return {
+        'board': chess.Board(fen),
+        'reserves': {'w': [], 'b': [], **(reserves or {})},
+        'hostages': {'w': [], 'b': [], **(hostages or {})}
+    }
+
+
+def test_drop_blocking_check_is_not_checkmate():
+    fen = '6k1/8/8/8/8/8/5PPP/3r2K1 w - - 0 1'
+    assert hostage_rules.is_checkmate(make_state(fen))
+
+    game_state = make_state(fen, reserves={'w': [{'type': 'r', 'color': 'w'}]})
+    assert hostage_rules.legal_actions(game_state)['drops'] == {'r': ['e1', 'f1']}
+    assert not hostage_rules.is_checkmate(game_state)
+    assert not hostage_rules.is_game_over(game_state)
+
+
+def test_double_check_cannot_be_blocked_by_a_drop():
+    game_state = make_state('6k1/8/8/8/8/8/4nPPP/3r2K1 w - - 0 1',
+                            reserves={'w': [{'type': 'q', 'color': 'w'}]})
+    assert not hostage_rules.has_legal_drop(game_state)
+    assert hostage_rules.is_checkmate(game_state)
+
+
+def test_drop_or_exchange_avoids_stalemate():
+    fen = '7k/5Q2/6K1/8/8/8/8/8 b - - 0 1'
+    assert hostage_rules.is_stalemate(make_state(fen))
+    assert not hostage_rules.is_stalemate(make_state(fen, reserves={'b': [{'type': 'p', 'color': 'b'}]}))
+    assert not hostage_rules.is_stalemate(make_state(fen, hostages={
+        'b': [{'type': 'q', 'color': 'w'}],
+        'w': [{'type': 'p', 'color': 'b'}]
+    }))
@@ -0,0 +1,29 @@
+"""Deciziile AI-ului între plasări din rezerve și mutări normale."""
+import chess
+
+from minimax_ai import MinimaxAI
+
+
+def make_state(fen, reserves=None):
+    return {
+        'board': chess.Board(fen),
+        'hostages': {'w': [], 'b': []},
+        'reserves': {'w': [], 'b': [], **(reserves or {})}
+    }
+
+
+def test_capture_beats_reserve_drop():
+    # Regina albă din e5 poate fi luată de pionul d6
+    game_state = make_state('4k3/8/3p4/4Q3/8/8/8/4K3 b - - 0 1',
+                            reserves={'b': [{'type': 'p', 'color': 'b'}]})
+    engine = MinimaxAI(depth=2)
+    assert engine.get_best_reserve_placement(game_state, 'b') is not None
+    assert engine.should_drop_piece(game_state, 'b') is None
+    assert engine.get_best_move(game_state)[0] == chess.Move.from_uci('d6e5')
+
+
+def test_blocking_drop_is_played_without_board_moves():
+    game_state = make_state('3R2k1/5ppp/8/8/8/8/8/6K1 b - - 0 1',
+                            reserves={'b': [{'type': 'r', 'color': 'b'}]})
+    placement = MinimaxAI(depth=2).should_drop_piece(game_state, 'b')
+    assert placement is not None and placement['square'] == 'f8'
@@ -0,0 +1,61 @@
+"""Admiterea căutărilor care ocupă mai multe locuri (analiza în lot)."""
+import threading
+import time
+
+import pytest
+
+from search_scheduler import SchedulerBusy, SearchScheduler
+
+
+def wait_for(condition):
+    deadline = time.perf_counter() + 2
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.005)
+
+
+def test_batch_reserves_one_slot_per_process():
+    scheduler = SearchScheduler(max_concurrent=4, max_wait=2)
+    scheduler.acquire(3)
+    scheduler.acquire(3)
+    order = []
+
+    def run(name, slots):
+        scheduler.acquire(3, slots)
+        order.append(name)
+
+    batch = threading.Thread(target=run, args=('batch', 3))
+    batch.start()
+    wait_for(lambda: scheduler.waiting == 1)
+    small = threading.Thread(target=run, args=('small', 1))
+    small.start()
+    wait_for(lambda: scheduler.waiting == 2)
+    assert order == []
+
+    # Un loc liber nu ajunge lotului, iar căutarea mică nu îl depășește
+    scheduler.release(time.perf_counter())
+    batch.join()
+    assert order == ['batch'] and scheduler.running == 4
+
+    scheduler.release(time.perf_counter(), 3)
+    small.join()
+    assert order == ['batch', 'small'] and scheduler.running == 2
+
+
+def test_expired_batch_lets_smaller_requests_through():
+    scheduler = SearchScheduler(max_concurrent=2, max_wait=0.4)
+    scheduler.acquire(1)
+    errors = []
+
+    def batch():
+        with pytest.raises(SchedulerBusy) as error:
+            scheduler.acquire(1, 2)
+        errors.append(error.value.reason)
+
+    waiting = threading.Thread(target=batch)
+    waiting.start()
+    wait_for(lambda: scheduler.waiting == 1)
+    # Sosește mai târziu, deci stă în coadă în spatele lotului până când acesta expiră
+    time.sleep(0.2)
+    scheduler.acquire(1)
+    waiting.join()
+    assert errors == ['wait_timeout'] and scheduler.running == 2